@@ -1,10 +1,10 @@
 # coding=utf-8
-import networkx as nx
-#import matplotlib.pyplot as plt
 import sys
-from aconode import ACONode
 from colony import Colony
-from random import choice
+from pheromone import PheromoneStore
+from strategies import BestAnt
+from budget import WalkBudget
+from streams import random_stream, PLACEMENT_STREAM
 import math
 
 '''
@@ -18,9 +18,15 @@ class ACOProblem(object):
       
     '''Generic class for a generic ACOProblem'''
     
-    def __init__(self, initial_states, solution_states, alpha, beta, number_of_ants, p, q0, base_attractiveness, initial_tau) :      
+    def __init__(self, initial_states, solution_states, alpha, beta, number_of_ants, p, q0, base_attractiveness, initial_tau, max_nodes=10000000, prune_nodes=None, strategy=None, seed=None) :      
         '''
         Receives a list of initial_states and solution_states
+        max_nodes: we give up when the graph grows over this number of nodes
+        prune_nodes: when the graph grows over this number of nodes, we prune it
+        down to at most this number after the iteration (see prune_graph). Never by default
+        strategy: pheromone update strategy (see strategies.py), BestAnt by default
+        seed: seed of the run. The same seed gives the same run, see streams.py.
+        None (the default) gives a different one every time
         To implement:
         Initialize a new ACOProblem 
         '''
@@ -31,13 +37,34 @@ class ACOProblem(object):
         self.p = p # Evaporation rate
         self.q0 = q0 # Parameter of the problem. Indicates the tendency of the ants of exploring or following another ants
         self.base_attractiveness = base_attractiveness # Parameter Q
-        self.global_graph = None # This is our global graph
+        self.global_graph = None # This is our global graph (a PheromoneStore)
+        self.colony_engine = None # Something with generate_ant_solutions() to use instead of the colony, see vectorized.py
+        self.max_nodes = max_nodes
+        self.prune_nodes = prune_nodes
+        self.prune_tolerance = 0.01 # Edges under initial_tau plus this fraction of it are pruned
+        self.shortest_paths = True # Look for shorter paths in the graph after each iteration, see shortest_path_feedback
+        self.walk_budget = WalkBudget() # How far an ant may walk, see budget.py. None for no limit
+        self.strategy = strategy if strategy is not None else BestAnt()
         self.number_of_ants = number_of_ants
-        self.colony = Colony(self.number_of_ants)  # We create a Colony with n Ants
+        self.seed = seed
+        self.random = random_stream(seed, PLACEMENT_STREAM) # For the ant placement
+        self.colony = Colony(self.number_of_ants, seed)  # We create a Colony with n Ants
         
         self.initial_tau = initial_tau
         
         self.global_best_solution = None
+        self.iterations = 0 # Iterations of the last run
+        self.verbose = True # Print the progress of run
+
+    def __getstate__(self):
+        ''' Every ant holds its problem, so pickling an ant for another process
+            pickles the problem too. We leave the colony (all the other ants)
+            and the colony engine (which may hold processes) behind.
+        '''
+        state = self.__dict__.copy()
+        state['colony'] = None
+        state['colony_engine'] = None
+        return state
 
     def generate_node_hash(self, state):
         raise NotImplementedError()
@@ -70,6 +97,47 @@ class ACOProblem(object):
         Given a current state, it must return the successors of that state
         '''
 
+    def node_state(self, node_index):
+        raise NotImplementedError()
+        '''
+        To override:
+        The inverse of generate_node_hash. The graph only keeps node indexes,
+        so this is how an ant gets the state of the node it starts from
+        '''
+
+    def calculate_cost(self, state):
+        raise NotImplementedError()
+        '''
+        To override:
+        Heuristic cost from state to the solution
+        '''
+
+    def heuristic_info(self, state):
+        '''
+        To override (optional):
+        Whatever successors_with_cost needs to get the cost of the successors
+        of state from its own. Nothing by default.
+        '''
+        return None
+
+    def successors_with_cost(self, state, info):
+        '''
+        To override (optional):
+        Given a state and its heuristic_info, returns a list of
+        (successor, successor heuristic_info, successor cost).
+        Override it when the cost of a successor can be updated from its
+        parent's instead of computed from scratch.
+        '''
+        return [(s, None, self.calculate_cost(s)) for s in self.successors(state)]
+
+    def lower_bound(self, target):
+        raise NotImplementedError()
+        '''
+        To override (optional):
+        Returns a function of a state giving a cost from it to target that
+        never overestimates, for exact searches towards states other than
+        the solution (see reoptimize.py)
+        '''
             
     def pheromone_update_criteria(self, solution):
         raise NotImplementedError()
@@ -82,30 +150,28 @@ class ACOProblem(object):
         '''
 
     
-#     def draw_graph(self):
-#         
-#         pos=nx.spring_layout(self.global_graph)
-#         nx.draw(self.global_graph,pos,node_color='#A0CBE2',edge_color='#BB0000',width=2,with_labels=True)
-#         plt.show()
+    def draw_graph(self):
+        
+        # networkx and matplotlib are imported only now, see drawing.py
+        from drawing import draw_graph
+        draw_graph(self.global_graph)
         
 
-    def initial_graph_creation(self):
+    def initial_graph_creation(self, graph=None):
         
         '''
         # Initial graph creation
         Parameters: 
-        none
+        graph: PheromoneStore to start from (left by a previous run), a new one by default
         '''
         
-        self.global_graph = nx.Graph()
+        self.global_graph = graph if graph is not None else PheromoneStore()
+        self.global_graph.bounds = None # Our strategy sets them if it wants them
         # Now we place final node
             
         for s in self.initial_states:
             
-            node_index = self.generate_node_hash(s)
-            
-            self.global_graph.add_node(node_index)
-            self.global_graph.node[node_index]['node'] = ACONode(s, False, True) # Initial node
+            self.global_graph.add_node(self.generate_node_hash(s))
 
         
     def ant_placement(self):
@@ -145,12 +211,77 @@ class ACOProblem(object):
         while len(ants_id_list) > 0:
             
             assigned_ant_id = ants_id_list.pop()
-            assigned_initial_state = choice(range(0,len(self.initial_states)))
+            assigned_initial_state = self.random.choice(range(0,len(self.initial_states)))
             
             self.colony.ants[assigned_ant_id].set_start_node(self.generate_node_hash(self.initial_states[assigned_initial_state]), self.global_graph)
 
 
 
+    def reinforce(self, solution):
+        ''' reinforce
+            Parameters:
+            solution: list of node indexes of a solution found some other way (see idastar.py)
+            
+            Adds the path to the global graph and gives it the positive feedback
+            the best ant of an iteration gives, so the next ants are drawn to it
+        '''
+        
+        for i in range(len(solution) - 1):
+            self.global_graph.add_edge(solution[i], solution[i+1], self.initial_tau) # if exists doesnt override the data
+        
+        self.global_graph.deposit(solution, self.pheromone_update_criteria(solution))
+        
+        if self.objective_function(solution) < self.objective_function(self.global_best_solution):
+            self.global_best_solution = solution
+
+    def shortest_path_feedback(self, solutions):
+        ''' shortest_path_feedback
+            Parameters:
+            solutions: paths of the ants that finished this iteration
+            
+            The graph often has a path from a start to a solution shorter than
+            any ant's, made of edges different ants found. We look for the shortest
+            one (a breadth first search over the graph) and, if it is shorter than
+            the best of the iteration, reinforce it as the best ant would be.
+            
+            Returns the path reinforced, None if there was none shorter
+        '''
+        
+        path = self.global_graph.shortest_path([self.generate_node_hash(s) for s in self.initial_states],
+                                               [self.generate_node_hash(s) for s in self.solution_states])
+        
+        if path is None or len(path) >= len(min(solutions, key=len)):
+            return None
+        
+        self.reinforce(path)
+        
+        return path
+
+    def prune_graph(self):
+        ''' prune_graph
+            Parameters:
+            none
+            
+            Forgets the nodes whose edges all have (about) initial_tau, that is,
+            the ones no ant has reinforced or that have evaporated back, unless they
+            are on the best solution so far or are start or solution nodes. An ant
+            going there again simply expands them again.
+            
+            At most prune_nodes nodes are kept: the protected ones count against
+            them, and the rest are the ones with the most pheromone on an edge. Only
+            a best solution longer than prune_nodes leaves more.
+            Called between iterations, when no ant holds an edge id.
+            
+            Returns the number of nodes removed
+        '''
+        
+        protected = set(self.generate_node_hash(s) for s in self.initial_states + self.solution_states)
+        
+        if self.global_best_solution is not None:
+            protected.update(self.global_best_solution)
+        
+        return self.global_graph.prune(self.initial_tau * (1 + self.prune_tolerance), protected, self.prune_nodes)
+
     def generate_ant_solutions_mono(self):
         ''' generate_ant_solutions_mono
             Parameters:
@@ -169,7 +300,7 @@ class ACOProblem(object):
                 
                 # STATS if exists run exists aswell
 
-                if (len(self.global_graph)) > 2000000:
+                if (len(self.global_graph)) > self.max_nodes:
                     return False
 
                 
@@ -179,50 +310,71 @@ class ACOProblem(object):
                     sol = ant.__iteration__()
                     list_results_ants.append(sol)
                 
-                if [r[1] for r in list_results_ants] != [False for _ in range(len(self.colony.ants))]:
+                # An ant that has not finished returns (None,False). Ant 0 returns its
+                # path with 0, so we look at the path, not at the id
+                if [r[0] for r in list_results_ants] != [None for _ in range(len(self.colony.ants))]:
                     break
+                
+                # The limit stopped every ant twice and nobody got there: more room (see budget.py).
+                # Walks stopped by the bound are not counted, so this only fires when the limit collapses
+                if self.walk_budget is not None and self.walk_budget.walks >= 2 * self.number_of_ants:
+                    self.walk_budget.update(self.walk_budget.bound)
 
-            # We see which one is the best to give some positive feedback                 
-            best_sol = sys.maxint
-            best_ant = None
-        
-            for sol in list_results_ants:
-                if sol[1] == False:
-                    continue
-                if len(sol[0]) < best_sol:
-                    best_sol,best_ant = sol
-                    
+            solutions = [r for (r,b) in list_results_ants if r is not None]
+            
+            # Every ant either found the solution or was still walking
+            if self.walk_budget is not None:
+                self.walk_budget.record(len(solutions), self.number_of_ants)
+            
             # Global update
             
-            self.colony.ants[best_ant].positive_feedback() 
+            self.pheromone_update(solutions)
+
+            return solutions
 
-            return [r for (r,b) in list_results_ants if b != False]
 
+    def pheromone_update(self, solutions):
+        ''' pheromone_update
+            Parameters:
+            solutions: paths (lists of node indexes) of the ants that finished this iteration
+            
+            Global update, as the strategy says (see strategies.py)
+        '''
+        
+        self.strategy.global_update(self, self.global_graph, solutions)
 
     
-    def run(self, same_results_condition):
+    def run(self, same_results_condition, graph=None):
         
         '''
             Parameters:
             same_results_condition: Times we need to have the same result to exist.
             Means that it has considerably converged.
+            graph: PheromoneStore to start from, to keep the pheromone of previous runs
+            (towards the same solution). It is updated in place.
             
             This is the ACO Algorithm itself
             
         '''
         
-        print ("ACO Problem initialized.")
+        if self.verbose:
+            print ("ACO Problem initialized.")
         
-        self.initial_graph_creation()
+        self.initial_graph_creation(graph)
+        self.iterations = 0
         
-        last_value = sys.maxint
+        last_value = sys.maxsize
         same_value_times = 0
         first_iteration = True
         
         while not(self.end_condition()):
             
+            self.iterations += 1
             #print("\t Generating ANT Solutions...")
-            solutions = self.generate_ant_solutions_mono()
+            if self.colony_engine is None:
+                solutions = self.generate_ant_solutions_mono()
+            else:
+                solutions = self.colony_engine.generate_ant_solutions()
 
             #print("\t Found "+ str(len(solutions)) + " solutions")
             
@@ -246,12 +398,29 @@ class ACOProblem(object):
                     
                 last_value = sol
                 
-                print ("Solucion de "+ str(len(sol)))
+                if self.verbose:
+                    print ("Solucion de "+ str(len(sol)))
                 
                 if self.objective_function(sol) < self.objective_function(self.global_best_solution):
                     self.global_best_solution = sol
-                    #self.estimate = self.objective_function(sol)
-                    print("\t Global solution improved! ", len(sol))
+                    if self.verbose:
+                        print("\t Global solution improved! ", len(sol))
+            
+            if self.colony_engine is None and self.shortest_paths:
+                
+                path = self.shortest_path_feedback(solutions)
+                
+                if path is not None and self.verbose:
+                    print("\t Shorter path in the graph: " + str(len(path)))
+            
+            if self.walk_budget is not None:
+                self.walk_budget.update(self.objective_function(self.global_best_solution) - 1)
+            
+            if self.colony_engine is None and self.prune_nodes is not None and len(self.global_graph) > self.prune_nodes:
+                
+                removed = self.prune_graph()
+                if self.verbose:
+                    print("\t Pruned " + str(removed) + " nodes, " + str(len(self.global_graph)) + " left")
         return sol
 
             
\ No newline at end of file
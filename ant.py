@@ -1,12 +1,8 @@
 # coding=utf-8
 from __future__ import division
-import networkx as nx
-from aconode import ACONode
-import random
-import math
 import sys
-import matplotlib.pyplot as plt
-import operator
+from streams import random_stream
+from bisect import bisect_left
 
 '''
 ant.py
@@ -14,23 +10,44 @@ ant.py
 @Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
 
 '''
-# We have to re-seed our RNG in order to give different results on 
-# different tasks
 
-random.seed()
+def erase_loops(path):
+    
+    ''' The path (list of node indexes) without its loops: when a node comes
+        again, everything since its first visit goes away
+    '''
+    
+    erased = list()
+    positions = dict() # Node index: position in erased
+    
+    for node_index in path:
+        
+        position = positions.get(node_index)
+        
+        if position is not None:
+            for node in erased[position + 1:]:
+                del positions[node]
+            del erased[position + 1:]
+        else:
+            positions[node_index] = len(erased)
+            erased.append(node_index)
+    
+    return erased
 
 class Ant(object):
     
-    def __init__(self, ant_id):
+    def __init__(self, ant_id, seed=None):
         
         ''' Ant class
         This class is to be run as a multiprocessing Task
         Id: numerical identifier. starts from 0
+        seed: seed of the run, the ant draws from its own stream of it (see streams.py)
         startNode: numerical identifier of the start node
         currentNode: numerical identifier of the current node
         '''
         
         self.id = ant_id
+        self.random = random_stream(seed, ant_id) # Our own generator, it goes with us to the worker processes
         self.start_node_id = None # This is assigned on the start function of ACOProblem
         self.current_node_id = None # This is assigned on the start function of ACOProblem   
         self.last_node_id = None # Last node where we were
@@ -38,16 +55,22 @@ class Ant(object):
 
         self.possible_new_edges = list()
         
-        self.decision_tables = dict() # Decision tables for different nodes
-        
         self.aco_specific_problem = None # It's going to be passed by the specific aco problem in the __init__ so the ant knows
         # How to expand the graph, the parameters of the problem and so on
  
-        self.graph = None # The initial subgraph is passed from ACOProblem to the set_start_node method
+        self.graph = None # The global PheromoneStore is passed from ACOProblem to the set_start_node method
         self.solution_found = None # This is set in expand_node so move_to_another_ant goes there.
         
-        self.list_nodes_visited = None # List of node indexes visited
+        self.list_nodes_visited = None # List of node indexes visited, without loops (see move_ant)
+        self.visited = None # Node index: its position in list_nodes_visited
         self.iteration_number = None # To compute pheromone
+
+        self.current_state = None # State of the current node, see move_ant
+        self.current_heuristic_info = None # heuristic_info of the current node
+        self.current_cost = None # Heuristic cost of the current node (None for the start node)
+        self.steps = 0 # Steps of this walk, see WalkBudget
+        self.successors_heuristic = dict() # Node index: (state, heuristic_info, cost) of the last expanded node successors
+        self.successor_edges = dict() # Node index: edge id from the last expanded node
         
     def set_start_node(self, start_node_id, graph):
 
@@ -55,10 +78,16 @@ class Ant(object):
         self.current_node_id = start_node_id
         self.last_node_id = None
         self.graph = graph # So it directly updates the global graph
-        self.decision_tables = dict()
         self.list_nodes_visited = list()
         self.list_nodes_visited.append(self.current_node_id)
+        self.visited = {self.current_node_id: 0}
         self.solution_found = None
+        self.current_state = None
+        self.current_heuristic_info = None
+        self.current_cost = None
+        self.steps = 0
+        self.successors_heuristic = dict()
+        self.successor_edges = dict()
         
     def __str__(self):
         
@@ -87,8 +116,6 @@ class Ant(object):
             on the path
         '''
 
-        i = 0
-        cota_de_salida = self.aco_specific_problem.estimate
         #print(self)
         while self.current_node_id not in self.solution_nodes_id:     
             
@@ -115,27 +142,40 @@ class Ant(object):
 
             self.move_to_another_node()
                
-            if i != 0 and i % cota_de_salida == 0:
-                #print("\t Cota de salida: "+ str(cota_de_salida))
-                #print("\t Saliendo con "+ str(len(self.graph.node)) + " nodos")
+            if self.give_up():
                 #print (str(self.id)+" Saliendo en "+ str(self.current_node_id))
 
                 return (None,False)
-            i += 1
         
-        # Returns a path of nodes in order
-        return ([(node_index,self.graph.node[node_index]) for node_index in self.list_nodes_visited],self.id)
+        # Returns a path of node indexes in order
+        return (self.list_nodes_visited,self.id)
     
 
     def __iteration__(self):
         ''' Perfoms just one single iteration., This is to simulate concurrency
         '''
         if self.current_node_id in self.solution_nodes_id:
-            return ([(node_index,self.graph.node[node_index]) for node_index in self.list_nodes_visited],self.id)
+            return (self.list_nodes_visited,self.id)
         self.expand_node(self.current_node_id) 
         self.move_to_another_node()
         
+        # A walk that can not beat the best solution starts again
+        if self.give_up():
+            self.set_start_node(self.start_node_id, self.graph)
+        
         return (None,False)
+    
+    def give_up(self):
+        ''' Whether the walk so far should be abandoned, as the problem's
+            walk_budget says (see budget.py). Never at the solution
+        '''
+        
+        budget = self.aco_specific_problem.walk_budget
+        
+        if budget is None or self.current_node_id in self.solution_nodes_id:
+            return False
+        
+        return budget.abandon(self.steps, len(self.list_nodes_visited) - 1, self.current_cost)
         
     
     def expand_node(self, node_index_to_expand):
@@ -148,25 +188,35 @@ class Ant(object):
             and add edges from/to their parents and them).
         '''
         
-        node_to_expand = self.graph.node[node_index_to_expand]['node']
-        successors = self.aco_specific_problem.successors(node_to_expand.state)
+        # The state of the start node is the only one we do not get from a expansion
+        if self.current_state is None:
+            self.current_state = self.aco_specific_problem.node_state(node_index_to_expand)
+            self.current_heuristic_info = self.aco_specific_problem.heuristic_info(self.current_state)
+        
+        # The successors costs come from the current node's, see Puzzle.successors_with_cost
+        successors = self.aco_specific_problem.successors_with_cost(self.current_state, self.current_heuristic_info)
+        self.successors_heuristic = dict()
+        successors_indexes = list()
 
-        for s in successors:
+        for s, info, cost in successors:
             successor_index = self.aco_specific_problem.generate_node_hash(s)
-            
-            self.graph.add_node(successor_index) # we do this anyway to avoid a search
-            
-            if 'node' not in self.graph.node[successor_index].keys():
-                self.graph.node[successor_index]['node'] = ACONode(s)
-            
-            # If the edge doesnt exists yet
-            if successor_index not in self.graph.edge[node_index_to_expand].keys():
-                self.graph.add_edge(node_index_to_expand,successor_index, weight=self.aco_specific_problem.initial_tau)    
-                
-            self.possible_new_edges = [(n1,n2,e) for (n1,n2,e) in self.graph.edges(self.current_node_id, data=True) if n2 != self.last_node_id]
+            self.successors_heuristic[successor_index] = (s, info, cost)
+            successors_indexes.append(successor_index)
     
-            if self.aco_specific_problem.generate_node_hash(s) in self.solution_nodes_id:                
-                self.solution_found = self.aco_specific_problem.generate_node_hash(s)
+            if successor_index in self.solution_nodes_id:                
+                self.solution_found = successor_index
+        
+        # New nodes and edges get the initial pheromone, the existing ones keep theirs
+        edges = self.graph.expand(node_index_to_expand, successors_indexes, self.aco_specific_problem.initial_tau)
+        
+        self.successor_edges = dict(edges)
+        self.possible_new_edges = [(node_index_to_expand,n2,e) for (n2,e) in edges if n2 != self.last_node_id]
+        
+        # Tabu: we do not go back to a node of our path, unless there is nowhere else to go
+        not_visited = [edge for edge in self.possible_new_edges if edge[1] not in self.visited]
+        
+        if not_visited:
+            self.possible_new_edges = not_visited
 
     def move_ant(self, node_index):
         ''' move_ant
@@ -177,6 +227,10 @@ class Ant(object):
             Moves the ant.
             This is called only by move_to_another_node, because that method has to check
             first for efficiency that the node where the ant is going has not been visited already
+            
+            Going back to a node of the path erases the loop, so the path is always
+            the one from the start node without cycles: its nodes are all different,
+            and positive_feedback only reinforces paths like that.
         
             Performs a local update of the pheromone
         '''
@@ -185,13 +239,23 @@ class Ant(object):
             
             self.last_node_id = self.current_node_id
             self.current_node_id = node_index
-                
-            self.list_nodes_visited.append(node_index)
             
-            # local update
+            position = self.visited.get(node_index)
+            
+            if position is not None:
+                # Loop erasure
+                for erased in self.list_nodes_visited[position + 1:]:
+                    del self.visited[erased]
+                del self.list_nodes_visited[position + 1:]
+            else:
+                self.visited[node_index] = len(self.list_nodes_visited)
+                self.list_nodes_visited.append(node_index)
+            self.current_state, self.current_heuristic_info, self.current_cost = self.successors_heuristic[node_index]
+            self.steps += 1
             
-            self.graph.edge[self.last_node_id][self.current_node_id]['weight'] *= (1-self.aco_specific_problem.p) 
-            self.graph.edge[self.last_node_id][self.current_node_id]['weight'] += self.aco_specific_problem.p * self.aco_specific_problem.initial_tau
+            # local update, see strategies.py
+            
+            self.aco_specific_problem.strategy.local_update(self.aco_specific_problem, self.graph, self.successor_edges[node_index])
             
     
     def decision_table(self, node_index):
@@ -203,39 +267,65 @@ class Ant(object):
             node_index
         
             Returns:
-            Dictionary (Key: Node, Value: Value of aij associated with that node)
+            (nodes, cumulative, best): the nodes the ant can move to, the running
+            sum of their numerators tau^alpha * n^beta (so cumulative[-1] is the
+            denominator) and the position of the biggest one
             
-            Given the index of a node, calculates and/or returns the decision table for the node.
+            Given the index of a node, calculates the decision table for the node.
+            It is never normalized: move_to_another_node draws against the total.
 
         '''
 
-        decision_table = dict() 
+        alpha = self.aco_specific_problem.alpha
+        beta = self.aco_specific_problem.beta
+        
+        nodes = list()
+        cumulative = list()
         summatory_denominator = 0
+        best = 0
+        best_numerator = -1
                   
         for edge in self.possible_new_edges:
          
-            next_state = self.graph.node[edge[1]]['node'].state
-            pheromone = edge[-1]['weight'] # tau i,j pheromone (evaporated)
+            pheromone = self.graph.weight(edge[2]) # tau i,j pheromone (evaporated)
 
-            next_state_cost = self.aco_specific_problem.calculate_cost(next_state)
+            next_state_cost = self.successors_heuristic[edge[1]][2]
 
             # inverse of the cost of this potential new state
             # We check if the cost is 0 (hopefully) solution to avoid division by zero
             if next_state_cost != 0:
                 nij = 1.0 / next_state_cost
             else:
-                nij = sys.maxint
-                
-            numerator = math.pow(pheromone,self.aco_specific_problem.alpha) * math.pow(nij,self.aco_specific_problem.beta)
+                nij = sys.maxsize
+            
+            # Exponents 1 to 3 (as the usual alpha 1, beta 2) are just multiplications
+            if alpha == 1:
+                numerator = pheromone
+            elif alpha == 2:
+                numerator = pheromone * pheromone
+            elif alpha == 3:
+                numerator = pheromone * pheromone * pheromone
+            else:
+                numerator = pheromone ** alpha
+            
+            if beta == 1:
+                numerator *= nij
+            elif beta == 2:
+                numerator *= nij * nij
+            elif beta == 3:
+                numerator *= nij * nij * nij
+            else:
+                numerator *= nij ** beta
+            
+            if numerator > best_numerator:
+                best_numerator = numerator
+                best = len(nodes)
+            
             summatory_denominator += numerator
-            decision_table[edge[1]] = numerator
-
-        # We apply now the division of the numerators
+            nodes.append(edge[1])
+            cumulative.append(summatory_denominator)
 
-        decision_table.update((x,y/summatory_denominator) for x,y in decision_table.items())    
-
-        self.decision_tables[node_index] = decision_table
-        return decision_table
+        return (nodes, cumulative, best)
         
     def positive_feedback(self):
         ''' performs a positive feedback on the path
@@ -247,15 +337,7 @@ class Ant(object):
         
         #print ("hola soy "+ str(self.id) + " y voy a dar " + str(positive_feedback) + " de feedback a mi sol de "+ str(len(sol)))
         
-        for node_index in range(len(sol)):
-            
-            if node_index == len(sol)-1:
-                break
-            
-            this_node = sol[node_index]
-            next_node = sol[node_index+1]
-       
-            self.graph.edge[this_node][next_node]['weight'] += positive_feedback
+        self.graph.deposit(sol, positive_feedback)
 
         
     def move_to_another_node(self):
@@ -273,67 +355,54 @@ class Ant(object):
             if q <= q0 : The ant moves to the edge with more pheromone
             if q > q0  : The ant moves a randomly-chosen edge in proportion with its
             efficacy (eg. Heuristic)
+            
+            Given q > q0, (q - q0) / (1 - q0) is again uniform in (0, 1], so the
+            same draw picks the edge and we only need one random number per move.
         
         '''
         # If the solution is next, just go to it.
         
         if self.solution_found != None and self.current_node_id not in self.solution_nodes_id:
             self.move_ant(self.solution_found)
+            return
            
-        q = random.random()
+        q = self.random.random()
+        q0 = self.aco_specific_problem.q0
 
         # Proportional pseudo-random rule
+        
+        nodes, cumulative, best = self.decision_table(self.current_node_id)
           
-        if q <= self.aco_specific_problem.q0:
+        if q <= q0:
             #print("Exploitation")
             # arg max aij
-            
-            decision_table = self.decision_table(self.current_node_id)
-
-            next_node = max(decision_table.iteritems(), key=operator.itemgetter(1))[0]
-            self.move_ant(next_node)
-        
+            self.move_ant(nodes[best])
         
         else:      
-            # Otherwise, we create a list of probabilities
             #print("Exploration")
-            
-            proportion_list = dict()    
-            summatory_denominator = 0
-            decision_table = self.decision_table(self.current_node_id)
-            
-            for e in self.possible_new_edges:    
-                summatory_denominator += decision_table[e[1]]
-            
-            for node in decision_table.keys():
-                proportion_list[node] = decision_table[node] / summatory_denominator
-                         
-            self.move_ant(self.get_prop_random_node(proportion_list))
+            self.move_ant(nodes[self.get_prop_random_node(cumulative, (q - q0) / (1 - q0))])
 
-    def get_prop_random_node(self, prop_list):
+    def get_prop_random_node(self, cumulative, rand):
         
         ''' get_prop_random_node:
             Parameters: 
-            prob_list (dictionary of proportions)
-           
+            cumulative: running sum of the numerators (see decision_table)
+            rand: random number in (0, 1]
+            
+            Returns the position of the node drawn in proportion to its numerator.
             This is to be called from "move_to_another_node"
         '''
         
-        rand = random.random()
-        acc = 0 # accumulator
+        # First position whose running sum reaches rand * total. Nodes with
+        # nothing add nothing to the sum, so they can not be drawn
+        position = bisect_left(cumulative, rand * cumulative[-1])
         
-        for node in prop_list.keys():
-         
-            if prop_list[node] + acc > rand:
-                node_ret = node
-                break
-            acc += prop_list[node]
-            
-        return node_ret
+        # Rounding may leave us past the end
+        return min(position, len(cumulative) - 1)
     
               
     def draw_graph(self):
         
-        pos=nx.spring_layout(self.graph)
-        nx.draw(self.graph,pos,node_color='#A0CBE2',edge_color='#BB0000',width=2,with_labels=True)
-        plt.show()
\ No newline at end of file
+        # networkx and matplotlib are imported only now, see drawing.py
+        from drawing import draw_graph
+        draw_graph(self.graph)
\ No newline at end of file
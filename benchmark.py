@@ -0,0 +1,277 @@
+# coding=utf-8
+from __future__ import division, print_function
+import argparse
+import json
+import subprocess
+import sys
+import time
+from solver import SOLUTION, DEFAULT_PARAMETERS, puzzle_parameters, scramble
+from startup import median
+from streams import random_stream
+
+'''
+benchmark.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+Benchmark of the colony over sets of instances, to track regressions. Every
+instance is run through Puzzle.run in a fresh python process (as startup.py
+does), so its peak memory is its own. It prints one JSON line per instance:
+
+ - solved: whether the colony found a solution before max_nodes
+ - length: number of moves of the best solution
+ - optimal: optimal number of moves, when known (null otherwise)
+ - excess: length - optimal
+ - time: seconds of Puzzle.run (and of reoptimize.shorten, with --window)
+ - iterations: of the colony
+ - nodes: nodes of the pheromone graph (or table) at the end
+ - peak_rss_kb: peak resident memory of the process (and its workers)
+
+and a last line with the summary of the whole set (success rate, medians...).
+
+The instance sets:
+
+ - --korf FILE: Korf's 100 instances (or any file in the same format). A
+   line is the 16 tiles, optionally after an instance number and followed by
+   the optimal length. Korf's goal has the hole first (0 1 2 ... 15), so
+   instances are turned around to our goal, see from_korf.
+ - --scrambles N --depth D: N random walks of D moves (no going straight
+   back) from the goal, so their optimal length is at most D. --optimal gets
+   it with IDA* (after the run, not timed); only for small depths.
+
+Runs are seeded (--seed, see streams.py), so the same command gives the
+same solutions and iterations.
+
+Usage:
+    python benchmark.py --scrambles 20 --depth 20 --seed 1 > baseline.jsonl
+    python benchmark.py --korf korf100.txt --max-nodes 2000000
+'''
+
+
+def from_korf(tiles):
+
+    ''' The instance with our goal of one with Korf's goal (hole first): the
+        board turned 180 degrees, tile t renamed 16 - t. Both have the same
+        optimal length. Returns ([list of 16 tiles],hole)
+    '''
+
+    turned = [16 - t if t else 0 for t in reversed(tiles)]
+
+    return (turned, turned.index(0))
+
+
+def parse_korf(line):
+
+    ''' Returns (state, optimal length or None) of a Korf line, None for blank and # lines '''
+
+    numbers = [int(n) for n in line.split('#')[0].replace(',', ' ').split()]
+
+    if len(numbers) == 0:
+        return None
+
+    # The 16 tiles, after the instance number if there is one
+    for first in (0, 1):
+        tiles = numbers[first:first + 16]
+        if sorted(tiles) == list(range(16)):
+            rest = numbers[first + 16:]
+            return (from_korf(tiles), rest[0] if rest else None)
+
+    raise ValueError("No 16 tiles (0 to 15) in " + repr(line))
+
+
+def nodes_created(puzzle):
+
+    ''' Nodes of the pheromone of whatever walked the colony '''
+
+    engine = puzzle.colony_engine
+
+    if engine is None:
+        return len(puzzle.global_graph)
+
+    if hasattr(engine, 'shared'):
+        return len(engine.shared)
+
+    return len(engine.pheromones)
+
+
+def peak_rss_kb():
+
+    ''' Peak resident memory of this process and its finished children, in kB '''
+
+    import resource
+
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+
+    # bytes on mac, kB everywhere else
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def run_instance(instance, optimal=None, find_optimal=False, pdb_directory='pdb', engine=None, **parameters):
+
+    ''' run_instance
+        Parameters:
+        instance: ([list of 16 tiles],hole)
+        optimal: its optimal length, if known
+        find_optimal: get it with IDA* when it is not known
+        pdb_directory: where the pattern databases are
+        engine: Puzzle keyword arguments of the engine (vectorized, processes, walk_limit)
+        parameters: overrides of DEFAULT_PARAMETERS (mode is ignored)
+
+        Runs in the measured process. Returns its measures (a dictionary)
+    '''
+
+    from puzzle import Puzzle
+
+    parameters, same_results_condition, _, window = puzzle_parameters(parameters)
+    parameters.update(engine or dict())
+
+    puzzle = Puzzle(instance, SOLUTION, pdb_directory=pdb_directory, **parameters)
+    puzzle.verbose = False
+
+    start = time.time()
+    solution = puzzle.run(same_results_condition)
+
+    solution = puzzle.global_best_solution if solution else None
+
+    if solution and window:
+        from reoptimize import shorten
+        solution = shorten(puzzle, solution, window)
+
+    elapsed = time.time() - start
+    nodes = nodes_created(puzzle)
+
+    if hasattr(puzzle.colony_engine, 'close'):
+        puzzle.colony_engine.close()
+
+    if optimal is None and find_optimal:
+        from idastar import ida_star
+        path, _ = ida_star(puzzle, puzzle.initial_states[0])
+        optimal = len(path) - 1
+
+    length = len(solution) - 1 if solution else None
+
+    return {
+        'solved': solution is not None,
+        'length': length,
+        'optimal': optimal,
+        'excess': length - optimal if length is not None and optimal is not None else None,
+        'time': elapsed,
+        'iterations': puzzle.iterations,
+        'nodes': nodes,
+        'peak_rss_kb': peak_rss_kb(),
+    }
+
+
+def summary(results):
+
+    ''' Summary of the results of a set '''
+
+    solved = [r for r in results if r['solved']]
+    known = [r for r in solved if r['excess'] is not None]
+
+    return {
+        'summary': True,
+        'instances': len(results),
+        'solved': len(solved),
+        'success_rate': len(solved) / len(results) if results else None,
+        'optimal_rate': sum(1 for r in known if r['excess'] == 0) / len(known) if known else None,
+        'mean_excess': sum(r['excess'] for r in known) / len(known) if known else None,
+        'median_time': median([r['time'] for r in results]),
+        'total_time': sum(r['time'] for r in results),
+        'median_iterations': median([r['iterations'] for r in results]),
+        'median_nodes': median([r['nodes'] for r in results]),
+        'max_peak_rss_kb': max(r['peak_rss_kb'] for r in results) if results else None,
+    }
+
+
+def benchmark(instances, find_optimal=False, pdb_directory='pdb', engine=None, **parameters):
+
+    ''' benchmark
+        Parameters:
+        instances: iterable of (id, state, optimal length or None)
+        the rest as run_instance
+
+        Generator of the results of every instance, each in a fresh process,
+        with its id
+    '''
+
+    for number, instance, optimal in instances:
+
+        task = {
+            'instance': instance,
+            'optimal': optimal,
+            'find_optimal': find_optimal,
+            'pdb_directory': pdb_directory,
+            'engine': engine,
+            'parameters': parameters,
+        }
+
+        output = subprocess.check_output([sys.executable, __file__, '--once', json.dumps(task)])
+
+        result = json.loads(output.decode('utf-8'))
+        result['id'] = number
+
+        yield result
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Benchmarks the colony over sets of 15 puzzles")
+    parser.add_argument('--korf', help="File with Korf's instances, one per line")
+    parser.add_argument('--scrambles', type=int, default=0, help="Number of random scrambles (default: 0)")
+    parser.add_argument('--depth', type=int, default=20, help="Moves of every scramble (default: 20)")
+    parser.add_argument('--optimal', action='store_true', help="Get the unknown optimal lengths with IDA*")
+    parser.add_argument('--vectorized', action='store_true', help="Use the vectorized colony")
+    parser.add_argument('--processes', type=int, default=None, help="Walk the colony in worker processes")
+    parser.add_argument('--walk-limit', type=int, default=10000, help="Steps of a worker ant (default: 10000)")
+    parser.add_argument('--pdb-directory', default='pdb', help="Where the pattern databases are (default: pdb)")
+    parser.add_argument('--once', help=argparse.SUPPRESS)
+
+    for name, value in sorted(DEFAULT_PARAMETERS.items()):
+        if name != 'mode':
+            parser.add_argument('--' + name.replace('_', '-'), type=int if value is None else type(value), default=value,
+                                help="(default: " + str(value) + ")")
+
+    args = parser.parse_args(argv)
+
+    if args.once:
+        task = json.loads(args.once)
+        print(json.dumps(run_instance(task['instance'], task['optimal'], task['find_optimal'],
+                                      task['pdb_directory'], task['engine'], **task['parameters'])))
+        return 0
+
+    parameters = dict((name, getattr(args, name)) for name in DEFAULT_PARAMETERS if name != 'mode')
+    engine = {'vectorized': args.vectorized, 'processes': args.processes, 'walk_limit': args.walk_limit}
+
+    instances = list()
+
+    if args.korf:
+        with open(args.korf) as f:
+            for line in f:
+                parsed = parse_korf(line)
+                if parsed is not None:
+                    instances.append(('korf-' + str(len(instances) + 1), parsed[0], parsed[1]))
+
+    # The scrambles only depend on the seed
+    for n in range(args.scrambles):
+        instance = scramble(args.depth, random_stream(args.seed, n))
+        instances.append(('scramble-' + str(args.depth) + '-' + str(n), instance, None))
+
+    if len(instances) == 0:
+        parser.error("Nothing to run, give --korf and/or --scrambles")
+
+    results = list()
+
+    for result in benchmark(instances, args.optimal, args.pdb_directory, engine, **parameters):
+        results.append(result)
+        print(json.dumps(result, sort_keys=True))
+        sys.stdout.flush()
+
+    print(json.dumps(summary(results), sort_keys=True))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+# coding=utf-8
+from __future__ import division
+
+'''
+budget.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+How far an ant may walk. Most steps used to go into walks that could not
+beat the best solution we already had. Once there is one (of best moves):
+
+ - a walk gives up after best + slack steps
+ - a walk gives up when its path plus the heuristic of where it is (which
+   never overestimates) is already longer than best
+
+When hardly any walk gets to the solution (a success rate under collapse)
+the slack doubles, and when many do (over healthy) it halves again, never
+under its first value. Before the first solution walks are not limited
+here (the pool has its own walk_limit).
+
+The rate is the one of the walks the limit is about: the ones that found
+the solution against the ones the limit stopped and the ones still walking
+when the iteration ended. The walks the bound stops are not failures of the
+limit (a larger slack would not save them), so they do not count.
+
+Whoever walks the ants tells the budget how many walks found the solution
+and how many were still walking (record, abandon counts the ones it stops),
+and ACOProblem.run updates it after each iteration.
+'''
+
+
+class WalkBudget(object):
+
+    ''' walk budget
+        Parameters:
+        slack: steps over the best solution a walk may take
+        collapse: success rate under which the slack doubles
+        healthy: success rate over which the slack halves
+        max_slack: the slack never grows over this
+    '''
+
+    def __init__(self, slack=20, collapse=0.025, healthy=0.04, max_slack=100000):
+
+        self.initial_slack = slack
+        self.slack = slack
+        self.collapse = collapse
+        self.healthy = healthy
+        self.max_slack = max_slack
+
+        self.bound = None # Moves of the best solution so far
+        self.limit = None # Steps a walk may take, None for no limit
+
+        self.walks = 0 # Walks ended (or cut by the end of an iteration) since the last update
+        self.successes = 0 # Of them, the ones that found the solution
+        self.abandoned = 0 # Walks stopped by the limit, in total
+        self.pruned = 0 # Walks stopped by the bound, in total
+
+    def abandon(self, steps, moves, cost):
+
+        ''' abandon
+            Parameters:
+            steps: steps the walk has taken
+            moves: moves of its path (without loops, see Ant.move_ant)
+            cost: heuristic cost of where it is, None if unknown
+
+            Whether the walk should give up. Only the ones over the limit
+            count as failed walks
+        '''
+
+        if self.limit is not None and steps > self.limit:
+            self.abandoned += 1
+            self.walks += 1
+            return True
+
+        if self.bound is not None and cost is not None and moves + cost > self.bound:
+            self.pruned += 1
+            return True
+
+        return False
+
+    def record(self, successes, walks):
+
+        ''' walks more walks ended (or were still walking at the end of the
+            iteration), successes of them with a solution
+        '''
+
+        self.successes += successes
+        self.walks += walks
+
+    def update(self, best):
+
+        ''' update
+            Parameters:
+            best: moves of the best solution so far, None if there is none
+
+            Adapts the slack to the success rate of the walks recorded since
+            the last update, and the limit to the best solution
+        '''
+
+        if best is not None:
+
+            # Nothing to go by without walks
+            if self.walks:
+
+                rate = self.successes / self.walks
+
+                if rate < self.collapse:
+                    self.slack = min(self.slack * 2, self.max_slack)
+                elif rate > self.healthy:
+                    self.slack = max(self.slack // 2, self.initial_slack)
+
+            self.bound = best
+            self.limit = best + self.slack
+
+        self.walks = 0
+        self.successes = 0
+
+    def __str__(self):
+
+        return ("WalkBudget: limit " + str(self.limit) + ", bound " + str(self.bound) + ", slack " + str(self.slack) +
+                ", " + str(self.abandoned) + " abandoned, " + str(self.pruned) + " pruned")
@@ -0,0 +1,114 @@
+# coding=utf-8
+from __future__ import division
+from array import array
+from hashtable import EMPTY, KEY_TYPECODE, home, home_shift, probe
+
+'''
+cache.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+A bounded cache keyed by node index (the packed state for the puzzle).
+
+It is a fixed-size open addressing table: a key can only live in the
+PROBES slots after its home slot, and when they are all taken one of them
+is evicted, so the cache never grows past its capacity no matter how big
+the graph gets. The slot evicted is picked with the clock algorithm (an
+approximation of LRU): every hit marks its slot as used, and eviction takes
+the first unmarked slot of the window, unmarking the ones it skips.
+
+Entries are never removed, only replaced, so a lookup can stop at the first
+empty slot.
+'''
+
+PROBES = 8
+
+
+class StateCache(object):
+
+    ''' state cache
+        Parameters:
+        capacity: number of entries, rounded up to a power of 2
+    '''
+
+    def __init__(self, capacity=1 << 16):
+
+        size = 1
+
+        while size < max(capacity, PROBES):
+            size <<= 1
+
+        self.capacity = size
+        self.mask = size - 1
+        self.shift = home_shift(size)
+
+        self.keys = array(KEY_TYPECODE, [EMPTY]) * size
+        self.values = [None] * size
+        self.used = bytearray(size) # Clock bits
+
+        self.number_of_entries = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+
+        return self.number_of_entries
+
+    def get(self, key):
+
+        ''' Value of key, None (and a miss) if it is not cached '''
+
+        slot = probe(self.keys, key, self.shift, PROBES)
+
+        if slot != -1 and self.keys[slot] == key:
+            self.hits += 1
+            self.used[slot] = 1
+            return self.values[slot]
+
+        self.misses += 1
+
+        return None
+
+    def put(self, key, value):
+
+        ''' Caches value for key, evicting another entry if its window is full '''
+
+        keys = self.keys
+        slot = probe(keys, key, self.shift, PROBES)
+
+        if slot != -1:
+            if keys[slot] == EMPTY:
+                self.number_of_entries += 1
+            keys[slot] = key
+            self.values[slot] = value
+            self.used[slot] = 0
+            return
+
+        # Full window: second chance for the slots used since the last sweep
+        slot = victim = home(key, self.shift)
+
+        for _ in range(PROBES):
+
+            if not self.used[slot]:
+                victim = slot
+                break
+
+            self.used[slot] = 0
+            slot = (slot + 1) & self.mask
+
+        self.evictions += 1
+        keys[victim] = key
+        self.values[victim] = value
+        self.used[victim] = 0
+
+    def hit_rate(self):
+
+        lookups = self.hits + self.misses
+
+        return self.hits / lookups if lookups else 0.0
+
+    def __str__(self):
+
+        return ("StateCache: " + str(self.number_of_entries) + "/" + str(self.capacity) + " entries, " +
+                str(self.hits) + " hits, " + str(self.misses) + " misses, " + str(self.evictions) + " evictions")
@@ -10,14 +10,15 @@ colony.py
 
 class Colony:
     
-    def __init__(self, numberOfAnts):
+    def __init__(self, numberOfAnts, seed=None):
         
         '''
         Creates an ant colony of 'numberOfAnts' ants
         with 0 from 0 to numberOfAnts - 1
+        seed: seed of the run, see streams.py
         '''
               
-        self.ants = [Ant(i) for i in range(0,numberOfAnts)]
+        self.ants = [Ant(i, seed) for i in range(0,numberOfAnts)]
         
             
     def __str__(self):
@@ -0,0 +1,28 @@
+# coding=utf-8
+
+'''
+drawing.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+Drawing of the pheromone graph. networkx and matplotlib are only imported
+when something is drawn, so solving never pays for them (or needs them).
+'''
+
+
+def draw_graph(graph):
+
+    ''' draw_graph
+        Parameters:
+        graph: PheromoneStore
+
+        Shows the graph in a matplotlib window
+    '''
+
+    import networkx as nx
+    import matplotlib.pyplot as plt
+
+    graph = graph.to_networkx()
+    pos=nx.spring_layout(graph)
+    nx.draw(graph,pos,node_color='#A0CBE2',edge_color='#BB0000',width=2,with_labels=True)
+    plt.show()
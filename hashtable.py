@@ -0,0 +1,91 @@
+# coding=utf-8
+from array import array
+
+'''
+hashtable.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+What the open addressing tables of node indexes (StateCache in cache.py,
+SharedPheromones in parallel.py and VectorizedPheromones in vectorized.py)
+have in common: the empty key, the multiplicative hash of a key to its home
+slot, the linear probe from there, and the array typecode of the keys.
+
+A node index is a packed state for the puzzle, 64 bits wide: 'L' is only
+32 bits on some platforms (Windows), so the arrays of them use 'Q' where
+the array module has it (Python 3). Python 2 has no 'Q': there 'L' is used
+instead, 64 bits on Linux and macOS.
+'''
+
+EMPTY = 0 # No node index is 0 for the puzzle
+HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+MASK_64 = 0xFFFFFFFFFFFFFFFF
+
+try:
+    array('Q')
+    KEY_TYPECODE = 'Q'
+except ValueError:
+    KEY_TYPECODE = 'L'
+
+
+def home_shift(capacity):
+
+    ''' Shift of the hash for a table of capacity slots, a power of 2 '''
+
+    return 64 - (capacity.bit_length() - 1)
+
+
+def home(key, shift):
+
+    ''' Slot a key is looked for first '''
+
+    return ((key * HASH_MULTIPLIER) & MASK_64) >> shift
+
+
+def probe(keys, key, shift, probes=None):
+
+    ''' probe
+        Parameters:
+        keys: the table, len(keys) a power of 2
+        key: node index, not EMPTY
+        shift: home_shift(len(keys))
+        probes: slots to look at from the home slot of key, None for as many as needed
+
+        Returns the slot of key, or the first EMPTY slot where it would go,
+        -1 if none of the probes slots is either
+    '''
+
+    mask = len(keys) - 1
+    slot = ((key * HASH_MULTIPLIER) & MASK_64) >> shift
+
+    if probes is None:
+        while True:
+            k = keys[slot]
+            if k == key or k == EMPTY:
+                return slot
+            slot = (slot + 1) & mask
+
+    for _ in range(probes):
+        k = keys[slot]
+        if k == key or k == EMPTY:
+            return slot
+        slot = (slot + 1) & mask
+
+    return -1
+
+
+def pack(values, typecode=KEY_TYPECODE):
+
+    ''' Node indexes to bytes, to send them between processes '''
+
+    values = array(typecode, values)
+
+    return values.tobytes() if hasattr(values, 'tobytes') else values.tostring()
+
+
+def unpack(packed, typecode=KEY_TYPECODE):
+
+    values = array(typecode)
+    values.frombytes(packed) if hasattr(values, 'frombytes') else values.fromstring(packed)
+
+    return values
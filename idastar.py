@@ -0,0 +1,116 @@
+# coding=utf-8
+
+'''
+idastar.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+Exact solver: IDA* with the heuristic of the problem (the 6-6-3 pattern
+databases for the puzzle, which never overestimate, so the first solution
+found is optimal). It works on the same packed states as the ants and
+updates the heuristic incrementally with successors_with_cost.
+
+It can be given an upper bound, the length of a solution we already have
+(the best one of the colony): then it only looks for shorter ones, and
+finding none proves that solution optimal.
+
+It can also look for the way to any other state (a target), with the
+problem's lower_bound as heuristic, see reoptimize.py.
+'''
+
+FOUND = -1
+
+
+class NodeLimitReached(Exception):
+
+    ''' Raised when IDA* expands more nodes than it was allowed to '''
+
+    pass
+
+
+def ida_star(problem, state, upper_bound=None, node_limit=None, target=None):
+
+    ''' ida_star
+        Parameters:
+        problem: the ACOProblem (successors_with_cost, heuristic_info, solution_states)
+        state: state to solve
+        upper_bound: number of moves of a known solution, we only look for shorter ones
+        node_limit: raise NodeLimitReached after expanding this many nodes
+        target: state to go to instead of the solution
+
+        Returns (solution, expanded nodes), where solution is the list of node
+        indexes from state to the solution (or target), None if there is none
+        shorter than upper_bound
+    '''
+
+    if target is None:
+        solutions = set(problem.generate_node_hash(s) for s in problem.solution_states)
+        info = problem.heuristic_info(state)
+        threshold = problem.calculate_cost(state)
+        successors_with_cost = problem.successors_with_cost
+    else:
+        solutions = set([problem.generate_node_hash(target)])
+        lower_bound = problem.lower_bound(target)
+        info = None
+        threshold = lower_bound(state)
+
+        def successors_with_cost(state, info):
+            return [(s, None, lower_bound(s)) for s in problem.successors(state)]
+
+    path = [problem.generate_node_hash(state)]
+    expanded = [0]
+
+    # Longest solution we are interested in
+    maximum = upper_bound - 1 if upper_bound is not None else float('inf')
+
+    def search(state, info, g, h, last):
+
+        f = g + h
+
+        if f > threshold:
+            return f
+
+        if path[-1] in solutions:
+            return FOUND
+
+        expanded[0] += 1
+
+        if node_limit is not None and expanded[0] > node_limit:
+            raise NodeLimitReached()
+
+        minimum = float('inf')
+
+        for successor, successor_info, cost in successors_with_cost(state, info):
+
+            node_index = problem.generate_node_hash(successor)
+
+            # Going straight back never helps
+            if node_index == last:
+                continue
+
+            path.append(node_index)
+            t = search(successor, successor_info, g + 1, cost, path[-2])
+
+            if t == FOUND:
+                return FOUND
+
+            path.pop()
+
+            if t < minimum:
+                minimum = t
+
+        return minimum
+
+    while threshold <= maximum:
+
+        t = search(state, info, 0, threshold, None)
+
+        if t == FOUND:
+            return (path, expanded[0])
+
+        if t == float('inf'):
+            break
+
+        threshold = t
+
+    return (None, expanded[0])
@@ -0,0 +1,587 @@
+# coding=utf-8
+from array import array
+import ctypes
+import multiprocessing
+from budget import WalkBudget
+from hashtable import KEY_TYPECODE, home_shift, pack, probe, unpack
+
+'''
+parallel.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+A colony that walks its ants in a pool of worker processes.
+
+The old Consumer path (ACOProblem.generate_ant_solutions in acoproblem.py)
+started cpu_count() processes per call, pickled whole ants and graphs into
+them, and lost every pheromone update because each process changed its own
+copy of the graph.
+
+Here the workers are started once and each one owns a shard of the ants.
+The pheromone lives in shared memory (SharedPheromones), written only by the
+parent: workers read it while walking and send back each successful walk as
+a compact delta (the node indexes plus the neighbour slot of every move).
+The parent merges those deltas between iterations, so nothing is lost and
+nothing big is ever pickled.
+
+Every ant draws from its own random stream (see streams.py), which goes with
+it to its worker, and the deltas are merged in ant order, so a seeded run
+does not depend on how the workers are scheduled.
+
+An iteration is decided by its best walk, so the ants still walking stop
+as soon as they can not beat it (see CancellableBudget): the best walk of
+the iteration so far is shared by all the workers, and every ant looks at
+it every CHECK_EVERY steps. Which walks get there first depends on how the
+workers are scheduled, so a seeded run only looks at the best walk of its
+own worker (its ants walk one after another, always in the same order).
+'''
+
+NO_WALK = 0 # Best walk of an iteration before there is any
+CHECK_EVERY = 16 # Steps between two looks at the best walk of the iteration
+MAX_EMPTY_ROUNDS = 100 # Rounds in a row without a walk getting there, once there is a limit, before ending the iteration
+
+
+class SharedPheromones(object):
+
+    ''' shared pheromones
+        Parameters:
+        capacity: number of rows, a power of 2. At most half of them should be
+        used (see ColonyPool.grow)
+        initial_tau
+        max_degree: neighbours per node
+
+        Open addressing hash table of nodes in shared memory. The row of a node
+        has max_degree weights: weight j is the edge to the j-th successor of the
+        node (in the order ACOProblem.successors returns them). An edge is kept in
+        both its nodes rows, and the parent always updates both.
+
+        Evaporation is lazy, as in PheromoneStore: a row keeps its weights as
+        they were at the iteration of its stamp, and they are (1 - rate)^k of
+        that k iterations later (see decay). The parent brings a row up to date
+        (touch) before writing it, so an iteration costs the same whatever the
+        size of the table.
+    '''
+
+    def __init__(self, capacity, initial_tau, max_degree=4):
+
+        self.capacity = capacity
+        self.shift = home_shift(capacity)
+        self.initial_tau = initial_tau
+        self.max_degree = max_degree
+
+        self.keys = multiprocessing.RawArray(ctypes.c_uint64, capacity)
+        self.weights = multiprocessing.RawArray(ctypes.c_double, capacity * max_degree) # At the iteration of the row's stamp
+        self.stamps = multiprocessing.RawArray(ctypes.c_long, capacity) # Row: iteration its weights were written at
+        self.iteration = multiprocessing.RawValue(ctypes.c_long, 0) # Number of evaporations
+        self.rate = multiprocessing.RawValue(ctypes.c_double, 0.0) # Evaporation rate
+        self.number_of_nodes = 0
+        self.used_rows = array(KEY_TYPECODE) # Only kept by the parent, to copy the table and to change the rate
+
+    def __len__(self):
+
+        return self.number_of_nodes
+
+    def resized(self, capacity):
+
+        ''' A copy of the table with capacity rows (only the parent calls this) '''
+
+        table = SharedPheromones(capacity, self.initial_tau, self.max_degree)
+        table.iteration.value = self.iteration.value
+        table.rate.value = self.rate.value
+        degree = self.max_degree
+
+        for row in self.used_rows:
+            self.touch(row)
+            position = table.insert(self.keys[row]) * degree
+            table.weights[position:position + degree] = self.weights[row * degree:row * degree + degree]
+
+        return table
+
+    def decay(self, row):
+
+        ''' What the stored weights of a row are multiplied by to get them now '''
+
+        iterations = self.iteration.value - self.stamps[row]
+
+        return (1 - self.rate.value) ** iterations if iterations else 1.0
+
+    def touch(self, row):
+
+        ''' Brings the weights of a row up to date, before writing them. Only the parent calls this '''
+
+        factor = self.decay(row)
+
+        if factor != 1.0:
+            for position in range(row * self.max_degree, row * self.max_degree + self.max_degree):
+                self.weights[position] *= factor
+
+        self.stamps[row] = self.iteration.value
+
+    def row(self, node_index):
+
+        ''' Row of a node, -1 if it is not in the table '''
+
+        row = probe(self.keys, node_index, self.shift)
+
+        return row if self.keys[row] == node_index else -1
+
+    def insert(self, node_index):
+
+        ''' Row of a node, adding it (with initial_tau on every edge) if needed.
+            Only the parent calls this.
+        '''
+
+        keys = self.keys
+        row = probe(keys, node_index, self.shift)
+
+        if keys[row] == node_index:
+            return row
+
+        base = row * self.max_degree
+
+        for position in range(base, base + self.max_degree):
+            self.weights[position] = self.initial_tau
+
+        self.stamps[row] = self.iteration.value
+        keys[row] = node_index
+        self.number_of_nodes += 1
+        self.used_rows.append(row)
+
+        return row
+
+    def merge(self, path, forward, backward, p):
+
+        ''' merge
+            Parameters:
+            path: node indexes of a walk
+            forward: slot of path[i + 1] in the row of path[i]
+            backward: slot of path[i] in the row of path[i + 1]
+            p: evaporation rate
+
+            Applies the local update of every move of the walk. Returns the
+            flat positions of both copies of each edge, to deposit on them later
+        '''
+
+        weights = self.weights
+        tau = p * self.initial_tau
+        positions = list()
+        rows = [self.insert(node_index) for node_index in path]
+
+        for row in rows:
+            self.touch(row)
+
+        for i in range(len(path) - 1):
+
+            a = rows[i] * self.max_degree + forward[i]
+            b = rows[i + 1] * self.max_degree + backward[i]
+
+            weights[a] = weights[a] * (1 - p) + tau
+            weights[b] = weights[a]
+            positions.append((a, b))
+
+        return positions
+
+    def evaporate(self, rate):
+
+        ''' Every edge (both copies) loses rate of its pheromone. It only counts
+            an iteration (see decay), unless the rate changes: then every row is
+            brought up to date first
+        '''
+
+        if rate != self.rate.value:
+
+            for row in self.used_rows:
+                self.touch(row)
+
+            self.rate.value = rate
+
+        self.iteration.value += 1
+
+    def deposit(self, positions, amount):
+
+        degree = self.max_degree
+
+        for a, b in positions:
+            self.touch(a // degree)
+            self.touch(b // degree)
+            self.weights[a] += amount
+            self.weights[b] = self.weights[a]
+
+
+class PheromoneOverlay(object):
+
+    ''' The graph an Ant sees in a worker: the same interface Ant uses of
+        PheromoneStore (expand, weight and set_weight), but reading the shared
+        pheromone and keeping the ant's own local updates to itself.
+    '''
+
+    def __init__(self, shared):
+
+        self.shared = shared
+        self.reset()
+
+    def reset(self):
+
+        self.weights = list() # Local edge id: pheromone
+        self.slots = dict() # (node index, successor node index): slot
+
+    def expand(self, node_index, successors, weight):
+
+        shared = self.shared
+        row = shared.row(node_index)
+        base = row * shared.max_degree
+        decay = shared.decay(row) if row != -1 else 1.0
+        edges = list()
+
+        for j, successor in enumerate(successors):
+
+            self.slots[(node_index, successor)] = j
+            edges.append((successor, len(self.weights)))
+            self.weights.append(shared.weights[base + j] * decay if row != -1 else weight)
+
+        return edges
+
+    def weight(self, edge_id):
+
+        return self.weights[edge_id]
+
+    def set_weight(self, edge_id, weight):
+
+        self.weights[edge_id] = weight
+
+
+class CancellableBudget(WalkBudget):
+
+    ''' cancellable budget
+        Parameters:
+        iteration_best: shared moves of the best walk of the iteration in any
+        worker (NO_WALK if none yet), None to only look at our own
+        check_every: steps between two looks at it
+
+        The walk budget of the ants of a worker. It also gives up the walks
+        that can not beat the best walk of the iteration: their path plus the
+        heuristic of where they are is at least as long.
+    '''
+
+    def __init__(self, iteration_best=None, check_every=CHECK_EVERY):
+
+        WalkBudget.__init__(self)
+        self.iteration_best = iteration_best
+        self.check_every = check_every
+        self.own_best = NO_WALK # Best walk of the iteration of this worker
+        self.cancelled = 0
+
+    def start_iteration(self, limit, bound):
+
+        self.limit = limit
+        self.bound = bound
+        self.own_best = NO_WALK
+
+    def found(self, moves):
+
+        ''' A walk of this worker found a solution of moves moves '''
+
+        if self.own_best == NO_WALK or moves < self.own_best:
+            self.own_best = moves
+
+    def abandon(self, steps, moves, cost):
+
+        if WalkBudget.abandon(self, steps, moves, cost):
+            return True
+
+        if cost is None or steps % self.check_every != 0:
+            return False
+
+        best = self.own_best
+
+        if self.iteration_best is not None:
+            shared_best = self.iteration_best.value
+            if shared_best != NO_WALK and (best == NO_WALK or shared_best < best):
+                best = shared_best
+
+        if best != NO_WALK and moves + cost >= best:
+            self.cancelled += 1
+            return True
+
+        return False
+
+
+def choice_start(problem, ant):
+
+    ''' Node index of a random initial state, as ant_placement does, drawn from the ant's stream '''
+
+    return problem.generate_node_hash(ant.random.choice(problem.initial_states))
+
+
+class ColonyWorker(multiprocessing.Process):
+
+    ''' Process that walks a shard of the ants. Each task is the (walk limit,
+        bound) of an iteration (see budget.py), None to stop. iteration_best
+        and its lock are the pool's, None to not share the best walks
+    '''
+
+    def __init__(self, problem, ants, shared, task_queue, result_queue, iteration_best=None, lock=None):
+
+        multiprocessing.Process.__init__(self)
+        self.daemon = True
+        self.problem = problem
+        self.ants = ants
+        self.shared = shared
+        self.task_queue = task_queue
+        self.result_queue = result_queue
+        self.iteration_best = iteration_best
+        self.lock = lock
+
+    def walk(self, ant, overlay):
+
+        ''' Returns the delta of a successful walk, None otherwise '''
+
+        problem = self.problem
+        start = choice_start(problem, ant)
+
+        overlay.reset()
+        ant.set_start_node(start, overlay)
+        path, _ = ant()
+
+        if path is None:
+            return None
+
+        self.found(len(path) - 1)
+
+        forward = bytearray()
+        backward = bytearray()
+
+        for i in range(len(path) - 1):
+
+            a, b = path[i], path[i + 1]
+            forward.append(overlay.slots[(a, b)])
+
+            if (b, a) in overlay.slots:
+                backward.append(overlay.slots[(b, a)])
+            else:
+                # The last node is never expanded
+                successors = [problem.generate_node_hash(s) for s in problem.successors(problem.node_state(b))]
+                backward.append(successors.index(a))
+
+        return (ant.id, pack(path), bytes(forward), bytes(backward))
+
+    def found(self, moves):
+
+        ''' Tells the other workers (and our budget) about a walk of moves moves '''
+
+        self.problem.walk_budget.found(moves)
+
+        if self.iteration_best is not None:
+            with self.lock:
+                if self.iteration_best.value == NO_WALK or moves < self.iteration_best.value:
+                    self.iteration_best.value = moves
+
+    def run(self):
+
+        overlay = PheromoneOverlay(self.shared)
+
+        # Our ants always have a limit (the parent's), even if the problem has no budget
+        budget = CancellableBudget(self.iteration_best)
+        self.problem.walk_budget = budget
+
+        for ant in self.ants:
+            ant.aco_specific_problem = self.problem
+
+        while True:
+
+            task = self.task_queue.get()
+
+            if task is None:
+                # Poison pill means shutdown. Our ants' streams go back to the parent, for the next workers
+                self.result_queue.put([(ant.id, ant.random.getstate()) for ant in self.ants])
+                break
+
+            # Ant.__call__ gives up as the budget says
+            budget.start_iteration(*task)
+            abandoned = budget.abandoned
+            deltas = list()
+
+            for ant in self.ants:
+                delta = self.walk(ant, overlay)
+                if delta is not None:
+                    deltas.append(delta)
+
+            # With the walks the limit stopped, the only failures of the limit (see budget.py)
+            self.result_queue.put((deltas, budget.abandoned - abandoned))
+
+
+class ColonyPool(object):
+
+    ''' colony pool
+        Parameters:
+        problem: the ACOProblem (with its colony)
+        processes: number of workers (defaults to every core)
+        capacity: rows of the shared pheromone table at first, a power of 2. It
+        doubles as the walks need it, up to the problem's max_nodes
+        walk_limit: steps after which an ant gives up (Ant.__call__), until
+        the problem's walk_budget has a limit of its own (see budget.py)
+        cancel: whether the workers share the best walk of the iteration to stop
+        the walks that can not beat it. By default, unless the problem is seeded
+
+        Use it as the problem's colony_engine. Workers are started on the
+        first iteration and live until close() (or the parent's exit), or
+        until the table grows (see grow).
+    '''
+
+    def __init__(self, problem, processes=None, capacity=1 << 16, walk_limit=10000, cancel=None):
+
+        self.problem = problem
+        self.processes = processes or multiprocessing.cpu_count()
+        self.walk_limit = walk_limit
+        self.shared = SharedPheromones(capacity, problem.initial_tau)
+        self.workers = None
+
+        if cancel is None:
+            cancel = getattr(problem, 'seed', None) is None
+
+        # Moves of the best walk of the iteration, written with the lock and read without it
+        self.iteration_best = multiprocessing.RawValue(ctypes.c_long, NO_WALK) if cancel else None
+        self.lock = multiprocessing.Lock() if cancel else None
+
+    def start(self):
+
+        ants = self.problem.colony.ants
+        self.result_queue = multiprocessing.Queue()
+        self.workers = list()
+
+        for w in range(self.processes):
+            worker = ColonyWorker(self.problem, ants[w::self.processes], self.shared,
+                                  multiprocessing.Queue(), self.result_queue, self.iteration_best, self.lock)
+            worker.start()
+            self.workers.append(worker)
+
+    def close(self):
+
+        if self.workers is not None:
+
+            for worker in self.workers:
+                worker.task_queue.put(None)
+
+            # The ants go on from where their streams are, if the workers are started again
+            ants = dict((ant.id, ant) for ant in self.problem.colony.ants)
+
+            for _ in self.workers:
+                for ant_id, state in self.result_queue.get():
+                    ants[ant_id].random.setstate(state)
+
+            for worker in self.workers:
+                worker.join()
+
+            self.workers = None
+
+    def grow(self, nodes):
+
+        ''' Doubles the shared table until nodes nodes fit in half of it. The
+            workers only see the table they were started with, so they are
+            started again (on the next iteration)
+        '''
+
+        capacity = self.shared.capacity
+
+        while 2 * nodes > capacity:
+            capacity *= 2
+
+        self.close()
+        self.shared = self.shared.resized(capacity)
+
+    def generate_ant_solutions(self, walk_limit=None):
+
+        ''' generate_ant_solutions
+            Parameters:
+            walk_limit: defaults to the one given to the pool, used until the
+            problem's walk_budget has a limit
+
+            Return:
+            A list of solutions (paths), like ACOProblem.generate_ant_solutions_mono,
+            or False when the shared pheromone table has more than max_nodes
+            nodes, or when no walk gets there before the first solution even with
+            walk_limit doubled up to max_nodes.
+
+            Once there is a solution, rounds where nobody gets there are walked
+            again (as the ant by ant colony starts its ants again), and after
+            MAX_EMPTY_ROUNDS of them in a row the iteration ends with the best
+            solution so far as its only one
+        '''
+
+        problem = self.problem
+        budget = problem.walk_budget
+        walk_limit = walk_limit or self.walk_limit
+        empty_rounds = 0
+
+        while True:
+
+            if len(self.shared) > problem.max_nodes:
+                return False
+
+            if self.workers is None:
+                self.start()
+
+            if budget is None or budget.limit is None:
+                task = (walk_limit, budget.bound if budget is not None else None)
+            else:
+                task = (budget.limit, budget.bound)
+
+            # Every worker is waiting for its task, nobody is writing
+            if self.iteration_best is not None:
+                self.iteration_best.value = NO_WALK
+
+            for worker in self.workers:
+                worker.task_queue.put(task)
+
+            deltas = list()
+            abandoned = 0
+
+            for _ in self.workers:
+                worker_deltas, worker_abandoned = self.result_queue.get()
+                deltas.extend(worker_deltas)
+                abandoned += worker_abandoned
+
+            # The walks stopped by the bound or cancelled are not counted
+            if budget is not None:
+                budget.record(len(deltas), len(deltas) + abandoned)
+
+            if len(deltas) == 0:
+
+                empty_rounds += 1
+
+                if budget is not None and budget.limit is not None:
+                    # Nobody got there: more room (see budget.py)
+                    budget.update(budget.bound)
+                    if empty_rounds >= MAX_EMPTY_ROUNDS and problem.global_best_solution:
+                        return [list(problem.global_best_solution)]
+                else:
+                    # Nobody got there yet: longer walks, as long as one could fit in max_nodes
+                    walk_limit *= 2
+                    if walk_limit > problem.max_nodes:
+                        return False
+
+                continue
+
+            walks = [(ant_id, list(unpack(path)), forward, backward) for ant_id, path, forward, backward in sorted(deltas)]
+            nodes = len(self.shared) + sum(len(path) for _, path, _, _ in walks)
+
+            # Every worker is waiting for its task, so this is the time
+            if 2 * nodes > self.shared.capacity:
+                self.grow(nodes)
+
+            solutions = list()
+            best = None
+
+            for ant_id, path, forward, backward in walks:
+
+                positions = self.shared.merge(path, bytearray(forward), bytearray(backward), problem.p)
+                solutions.append(path)
+
+                if best is None or len(path) < len(best[0]):
+                    best = (path, positions)
+
+            # Global update: evaporation of every edge, then the best ant's feedback
+            self.shared.evaporate(problem.p)
+            self.shared.deposit(best[1], problem.pheromone_update_criteria(best[0]))
+
+            return solutions
@@ -0,0 +1,291 @@
+# coding=utf-8
+from __future__ import division
+import ctypes
+import mmap
+import os
+import struct
+
+'''
+patterndb.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+Loaders for the 6-6-3 pattern databases.
+
+Two on-disk formats are supported:
+
+ - Sparse (15-puzzle-663-N.db): one byte per 4 bits per tile index, as written
+   by the Java generator. A 6 tile table has 16^6 entries, only 16*15*14*13*12*11
+   of them valid.
+
+ - Compact (15-puzzle-663-N.cdb): a small header followed by one entry per
+   valid configuration, indexed by the lexicographic rank of the partial
+   permutation of the subset tiles. Entries are packed 2 per byte when every
+   value fits in 4 bits.
+
+Both expose lookup(index), where index is the sparse index calculate_cost
+builds, so the puzzle does not need to know which format it is reading.
+
+Both also have lookup_many(indexes), the same over a numpy array of
+indexes, for the vectorized colony (numpy is only imported there).
+
+Tables are memory mapped, never read into the process, so every solver
+process on a box shares the same page cache copy. Each process keeps one
+instance per file (see open_database), and pickling a database only sends
+its path, so ants sent to other processes carry a handle, not the table.
+'''
+
+# tile_subsets says which database a tile belongs to and tile_positions
+# which nibble of that database index it uses
+TILE_SUBSETS = [-1, 1, 0, 0, 0, 1, 1, 2, 2, 1, 1, 2, 2, 1, 2, 2]
+TILE_POSITIONS = [-1, 0, 0, 1, 2, 1, 2, 0, 1, 3, 4, 2, 3, 5, 4, 5]
+
+NUMBER_OF_SUBSETS = 3
+
+DATABASE_NAME = '15-puzzle-663-%d.db'
+COMPACT_DATABASE_NAME = '15-puzzle-663-%d.cdb'
+
+UNKNOWN = 0xFF
+
+# magic, number of tiles, bits per entry, reserved
+COMPACT_HEADER = struct.Struct('<4sBBH')
+COMPACT_MAGIC = b'PDBC'
+
+# Number of bits set in every 16 bit mask, to rank without building lists
+POPCOUNT = bytearray(bin(i).count('1') for i in range(1 << 16))
+
+# Databases opened by this process, by absolute path
+_open_databases = dict()
+
+
+def rank_weights(number_of_tiles):
+
+    ''' rank_weights
+        Parameters:
+        number_of_tiles
+
+        Weight of each slot in the rank: the number of ways the tiles after it
+        can be placed in the cells left.
+    '''
+
+    weights = list()
+
+    for slot in range(number_of_tiles):
+        weight = 1
+        for free_cells in range(16 - number_of_tiles + 1, 16 - slot):
+            weight *= free_cells
+        weights.append(weight)
+
+    return tuple(weights)
+
+
+def rank(index, weights):
+
+    ''' rank
+        Parameters:
+        index: sparse index (cell of slot i in the nibble i)
+        weights: rank_weights of the subset
+
+        Lexicographic rank of the partial permutation. Each cell counts only
+        the cells not already taken by a previous slot.
+    '''
+
+    result = 0
+    used = 0
+
+    for weight in weights:
+        cell = index & 0xF
+        index >>= 4
+        result += (cell - POPCOUNT[used & ((1 << cell) - 1)]) * weight
+        used |= 1 << cell
+
+    return result
+
+
+def map_file(path, offset=0):
+
+    ''' map_file
+        Parameters:
+        path
+        offset: bytes to skip (the header)
+
+        Maps the file and returns a ctypes byte array over it, which indexes to
+        ints in python 2 as well. The mapping is private (copy on write) only
+        because ctypes refuses read only buffers: we never write to it, so the
+        pages stay shared with every other process mapping the file.
+    '''
+
+    with open(path, 'rb') as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    return (ctypes.c_ubyte * (len(mapping) - offset)).from_buffer(mapping, offset)
+
+
+class PatternDatabase(object):
+
+    ''' Common part of both formats '''
+
+    def __reduce__(self):
+
+        # Pickled by handle: the other process maps the file itself
+        return (open_database, (self.path,))
+
+    def as_numpy(self):
+
+        ''' numpy uint8 view of the table (no copy) '''
+
+        import numpy
+
+        if getattr(self, '_numpy_table', None) is None:
+            self._numpy_table = numpy.frombuffer(self.table, dtype=numpy.uint8)
+
+        return self._numpy_table
+
+
+class SparsePatternDatabase(PatternDatabase):
+
+    ''' Database in the original 16^N bytes format '''
+
+    def __init__(self, path):
+
+        self.path = path
+        self.table = map_file(path)
+
+    def lookup(self, index):
+
+        return self.table[index]
+
+    def lookup_many(self, indexes):
+
+        return self.as_numpy()[indexes]
+
+
+class CompactPatternDatabase(PatternDatabase):
+
+    ''' Database indexed by rank, see compact_table '''
+
+    def __init__(self, path):
+
+        self.path = path
+
+        with open(path, 'rb') as f:
+            magic, self.number_of_tiles, self.bits, _ = COMPACT_HEADER.unpack(f.read(COMPACT_HEADER.size))
+
+        if magic != COMPACT_MAGIC:
+            raise ValueError(path + " is not a compact pattern database")
+
+        self.table = map_file(path, COMPACT_HEADER.size)
+
+        self.weights = rank_weights(self.number_of_tiles)
+
+    def lookup(self, index):
+
+        # Same as rank(), inlined because this is called for every heuristic
+        r = 0
+        used = 0
+
+        for weight in self.weights:
+            cell = index & 0xF
+            index >>= 4
+            r += (cell - POPCOUNT[used & ((1 << cell) - 1)]) * weight
+            used |= 1 << cell
+
+        if self.bits == 4:
+            return (self.table[r >> 1] >> ((r & 1) << 2)) & 0xF
+
+        return self.table[r]
+
+    def lookup_many(self, indexes):
+
+        import numpy
+
+        popcount = numpy.frombuffer(POPCOUNT, dtype=numpy.uint8)
+        indexes = numpy.asarray(indexes, dtype=numpy.int64)
+        r = numpy.zeros(indexes.shape, dtype=numpy.int64)
+        used = numpy.zeros(indexes.shape, dtype=numpy.int64)
+
+        for slot, weight in enumerate(self.weights):
+            cell = (indexes >> (slot << 2)) & 0xF
+            r += (cell - popcount[used & ((1 << cell) - 1)]) * weight
+            used |= 1 << cell
+
+        table = self.as_numpy()
+
+        if self.bits == 4:
+            return (table[r >> 1] >> ((r & 1) << 2)) & 0xF
+
+        return table[r]
+
+
+def compact_table(table, number_of_tiles):
+
+    ''' compact_table
+        Parameters:
+        table: sparse database (bytearray of 16^number_of_tiles entries)
+        number_of_tiles
+
+        Returns the compact database file contents (header included)
+    '''
+
+    weights = rank_weights(number_of_tiles)
+    size = 16 * weights[0]
+    bits = 4 if max(v for v in table if v != UNKNOWN) < 16 else 8
+
+    entries = bytearray(size)
+
+    for index, value in enumerate(table):
+        if value != UNKNOWN:
+            entries[rank(index, weights)] = value
+
+    if bits == 4:
+        packed = bytearray((size + 1) >> 1)
+        for r in range(0, size - 1, 2):
+            packed[r >> 1] = entries[r] | (entries[r + 1] << 4)
+        if size & 1:
+            packed[-1] = entries[-1]
+        entries = packed
+
+    return COMPACT_HEADER.pack(COMPACT_MAGIC, number_of_tiles, bits, 0) + bytes(entries)
+
+
+def open_database(path):
+
+    ''' Opens a database file in whatever format it is, once per process '''
+
+    path = os.path.abspath(path)
+
+    if path not in _open_databases:
+
+        with open(path, 'rb') as f:
+            magic = f.read(len(COMPACT_MAGIC))
+
+        if magic == COMPACT_MAGIC:
+            _open_databases[path] = CompactPatternDatabase(path)
+        else:
+            _open_databases[path] = SparsePatternDatabase(path)
+
+    return _open_databases[path]
+
+
+def load_databases(directory='pdb'):
+
+    ''' load_databases
+        Parameters:
+        directory: where the databases are
+
+        Returns the list of the 3 databases, indexed by subset. The compact
+        file of a subset is preferred over the sparse one when both exist.
+    '''
+
+    databases = list()
+
+    for subset in range(NUMBER_OF_SUBSETS):
+
+        path = os.path.join(directory, COMPACT_DATABASE_NAME % subset)
+
+        if not os.path.exists(path):
+            path = os.path.join(directory, DATABASE_NAME % subset)
+
+        databases.append(open_database(path))
+
+    return databases
@@ -0,0 +1,359 @@
+# coding=utf-8
+from __future__ import division, print_function
+import argparse
+import array
+import hashlib
+import multiprocessing
+import os
+import sys
+import time
+from hashtable import KEY_TYPECODE, pack, unpack
+from patterndb import TILE_SUBSETS, TILE_POSITIONS, DATABASE_NAME, COMPACT_DATABASE_NAME, UNKNOWN, compact_table
+
+'''
+pdb_generator.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+Builds the additive 6-6-3 pattern databases read by Puzzle.calculate_cost,
+so we no longer depend on the external Java generator to provision a box.
+
+Every table is indexed exactly the way calculate_cost expects: the board
+position of the tile in slot i of its subset goes in the nibble i of the
+index (pos << (tile_positions[tile] << 2)). Unused indexes are 0xFF.
+
+The value of an entry is the number of moves of the subset tiles needed to
+take them to their goal cells, the rest of the tiles being don't-cares.
+The hole position matters (a tile can only move into the hole), so the
+search runs over (pattern, hole region) pairs: moving the hole around
+without touching a pattern tile is free, so we collapse every hole
+position reachable that way into the region it floods.
+
+The search always fills a sparse table; by default it is then written in
+the compact (ranked) format, see patterndb.py.
+
+Usage:
+    python pdb_generator.py                   # builds the three .cdb tables in pdb/
+    python pdb_generator.py --format sparse   # builds the original .db tables
+    python pdb_generator.py --convert         # compacts the .db tables you already have
+    python pdb_generator.py --verify          # checks them against pdb/SHA256SUMS
+'''
+
+FILE_NAMES = {'sparse': DATABASE_NAME, 'compact': COMPACT_DATABASE_NAME}
+
+CHECKSUMS_NAME = 'SHA256SUMS'
+# The reference checksums ship with the repo, next to the 3 tile table
+CHECKSUMS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pdb', CHECKSUMS_NAME)
+
+# Masks to shift a set of cells left/right without wrapping around a row
+NOT_FIRST_COLUMN = 0xEEEE
+NOT_LAST_COLUMN = 0x7777
+
+NEIGHBOURS = list()
+
+for _cell in range(16):
+    _neighbours = list()
+    if _cell > 3:
+        _neighbours.append(_cell - 4)
+    if _cell < 12:
+        _neighbours.append(_cell + 4)
+    if _cell % 4 != 0:
+        _neighbours.append(_cell - 1)
+    if _cell % 4 != 3:
+        _neighbours.append(_cell + 1)
+    NEIGHBOURS.append(tuple(_neighbours))
+
+NEIGHBOURS_MASK = [sum(1 << n for n in neighbours) for neighbours in NEIGHBOURS]
+
+
+def subset_tiles(subset):
+
+    ''' Tiles of a subset, ordered by the nibble they use in the index '''
+
+    tiles = [t for t in range(1, 16) if TILE_SUBSETS[t] == subset]
+
+    return sorted(tiles, key=lambda t: TILE_POSITIONS[t])
+
+
+def goal_index(subset):
+
+    ''' Index of the goal configuration (tile t on cell t - 1) of a subset '''
+
+    index = 0
+
+    for tile in subset_tiles(subset):
+        index |= (tile - 1) << (TILE_POSITIONS[tile] << 2)
+
+    return index
+
+
+def flood(free, cell):
+
+    ''' Returns the mask of cells reachable from cell moving only through the free cells '''
+
+    region = 1 << cell
+
+    while True:
+
+        grown = (region | (region << 4) | (region >> 4) |
+                 ((region << 1) & NOT_FIRST_COLUMN) |
+                 ((region >> 1) & NOT_LAST_COLUMN)) & free
+
+        if grown == region:
+            return region
+
+        region = grown
+
+
+def lowest_cell(mask):
+
+    return (mask & -mask).bit_length() - 1
+
+
+def expand_states(args):
+
+    ''' expand_states
+        Parameters:
+        args: (number of tiles of the subset, packed array of state codes)
+
+        A state code is (index << 4) | lowest cell of the hole region.
+        Returns the packed codes of every state one pattern move away.
+        This is run in the worker processes, so it only deals with bytes.
+    '''
+
+    number_of_tiles, codes = args
+
+    successors = set()
+
+    for code in unpack(codes):
+
+        index = code >> 4
+        occupied = 0
+        cells = list()
+
+        for slot in range(number_of_tiles):
+            cell = (index >> (slot << 2)) & 0xF
+            cells.append(cell)
+            occupied |= 1 << cell
+
+        free = 0xFFFF ^ occupied
+        region = flood(free, code & 0xF)
+
+        for slot in range(number_of_tiles):
+
+            cell = cells[slot]
+
+            if not NEIGHBOURS_MASK[cell] & region:
+                continue
+
+            for n in NEIGHBOURS[cell]:
+
+                if not (region >> n) & 1:
+                    continue
+
+                # The tile moves to n and leaves the hole in its old cell
+                new_free = free ^ (1 << n) ^ (1 << cell)
+                new_index = index ^ ((cell ^ n) << (slot << 2))
+
+                successors.add((new_index << 4) | lowest_cell(flood(new_free, cell)))
+
+    return pack(successors)
+
+
+def generate_pattern_database(subset, processes=None, chunk_size=50000, verbose=False):
+
+    ''' generate_pattern_database
+        Parameters:
+        subset: number of the subset (0, 1 or 2) as in TILE_SUBSETS
+        processes: worker processes to use (defaults to every core)
+
+        Retrograde breadth-first search from the goal configuration. Each layer
+        is split in chunks expanded in parallel, and visited states are kept
+        in a bitset over the (index, region) codes.
+
+        Returns the database as a bytearray of 16 ** number_of_tiles entries
+    '''
+
+    tiles = subset_tiles(subset)
+    number_of_tiles = len(tiles)
+
+    table = bytearray([UNKNOWN]) * (1 << (number_of_tiles << 2))
+    visited = bytearray((1 << ((number_of_tiles + 1) << 2)) >> 3)
+
+    start_index = goal_index(subset)
+    occupied = sum(1 << (t - 1) for t in tiles)
+    # The hole starts in its goal cell, the last one
+    start = (start_index << 4) | lowest_cell(flood(0xFFFF ^ occupied, 15))
+
+    visited[start >> 3] |= 1 << (start & 7)
+    table[start_index] = 0
+    frontier = array.array(KEY_TYPECODE, [start])
+    depth = 0
+
+    pool = multiprocessing.Pool(processes or multiprocessing.cpu_count())
+
+    try:
+        while len(frontier) > 0:
+
+            depth += 1
+
+            chunks = list()
+
+            for i in range(0, len(frontier), chunk_size):
+                chunks.append((number_of_tiles, pack(frontier[i:i + chunk_size])))
+
+            frontier = array.array(KEY_TYPECODE)
+
+            for packed in pool.imap_unordered(expand_states, chunks):
+
+                for code in unpack(packed):
+
+                    byte, bit = code >> 3, 1 << (code & 7)
+
+                    if visited[byte] & bit:
+                        continue
+
+                    visited[byte] |= bit
+                    frontier.append(code)
+
+                    if table[code >> 4] == UNKNOWN:
+                        table[code >> 4] = depth
+
+            if verbose:
+                print("\t Subset " + str(subset) + ", depth " + str(depth) + ": " + str(len(frontier)) + " states")
+    finally:
+        pool.close()
+        pool.join()
+
+    return table
+
+
+def checksum(path):
+
+    digest = hashlib.sha256()
+
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def read_checksums(path=CHECKSUMS_PATH):
+
+    ''' Reads a sha256sum style file. Returns a dictionary (file name: digest) '''
+
+    checksums = dict()
+
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                digest, name = line.split()
+                checksums[name.lstrip('*')] = digest
+
+    return checksums
+
+
+def verify(directory='pdb', checksums_path=CHECKSUMS_PATH):
+
+    ''' verify
+        Parameters:
+        directory: where the databases are
+        checksums_path: sha256sum style file with the expected digests
+
+        Returns a dictionary (file name: True/False/None) where None means the
+        database file is missing
+    '''
+
+    results = dict()
+
+    for name, digest in sorted(read_checksums(checksums_path).items()):
+
+        path = os.path.join(directory, name)
+
+        if not os.path.exists(path):
+            results[name] = None
+        else:
+            results[name] = checksum(path) == digest
+
+    return results
+
+
+def generate(directory='pdb', subsets=(0, 1, 2), processes=None, file_format='compact', convert=False, verbose=False):
+
+    ''' generate
+        Parameters:
+        directory: where the databases are written
+        subsets: subsets to generate
+        processes: worker processes to use (defaults to every core)
+        file_format: 'compact' or 'sparse'
+        convert: compact the sparse tables already in directory instead of searching
+
+        Returns the paths written
+    '''
+
+    paths = list()
+
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    for subset in subsets:
+
+        start = time.time()
+
+        if convert:
+            with open(os.path.join(directory, DATABASE_NAME % subset), 'rb') as f:
+                table = bytearray(f.read())
+        else:
+            table = generate_pattern_database(subset, processes, verbose=verbose)
+
+        if file_format == 'compact':
+            table = compact_table(table, len(subset_tiles(subset)))
+
+        path = os.path.join(directory, FILE_NAMES[file_format] % subset)
+
+        # Write and rename so a killed run never leaves a truncated table
+        with open(path + '.tmp', 'wb') as f:
+            f.write(table)
+
+        os.rename(path + '.tmp', path)
+
+        if verbose:
+            print("Generated " + path + " in " + str(time.time() - start) + " seconds")
+
+        paths.append(path)
+
+    return paths
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Generates the 6-6-3 pattern databases for the 15 puzzle")
+    parser.add_argument('--directory', default='pdb', help="Where the databases are written (default: pdb)")
+    parser.add_argument('--subset', type=int, action='append', choices=[0, 1, 2],
+                        help="Generate only this subset (can be repeated)")
+    parser.add_argument('--processes', type=int, default=None, help="Worker processes (default: every core)")
+    parser.add_argument('--format', default='compact', choices=sorted(FILE_NAMES.keys()),
+                        help="Format of the databases (default: compact)")
+    parser.add_argument('--convert', action='store_true', help="Compact the existing sparse databases")
+    parser.add_argument('--verify', action='store_true', help="Only check the databases checksums")
+    args = parser.parse_args(argv)
+
+    subsets = args.subset or (0, 1, 2)
+    file_format = 'compact' if args.convert else args.format
+
+    if not args.verify:
+        generate(args.directory, subsets, args.processes, file_format, args.convert, verbose=True)
+
+    results = verify(args.directory)
+    names = [FILE_NAMES[file_format] % subset for subset in subsets]
+    results = dict((name, results.get(name)) for name in names)
+
+    for name, ok in sorted(results.items()):
+        print(name + ": " + {True: "OK", False: "FAILED", None: "MISSING"}[ok])
+
+    return 0 if all(results.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
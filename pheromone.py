@@ -0,0 +1,432 @@
+# coding=utf-8
+from array import array
+from hashtable import KEY_TYPECODE
+
+'''
+pheromone.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+The pheromone graph. It replaces the networkx graph we used to have, where
+every node carried a dict of attributes and every edge a {'weight': tau} dict,
+which made us give up at 2,000,000 nodes.
+
+Nodes are keyed by their node index (the packed state for the puzzle) and
+get a slot when added. A slot has room for max_degree neighbours, each one
+with the id of the edge that joins them. Edges are undirected: both ends
+point to the same edge id, and the pheromone of every edge lives in one
+array of doubles.
+
+Evaporation is lazy. The store counts the evaporations (its iteration) and
+every edge keeps the iteration its weight was written at; reading an edge
+applies the (1 - rate)^k it owes. So evaporate costs nothing, whatever the
+size of the graph, and only the edges the ants touch are ever updated. Use
+weight() and set_weight(), not the arrays, to read and write pheromone.
+'''
+
+NO_NEIGHBOUR = -1
+
+
+class PheromoneStore(object):
+
+    def __init__(self, max_degree=4):
+
+        '''
+        max_degree: maximum number of neighbours of a node (4 for the 15 puzzle)
+        '''
+
+        self.max_degree = max_degree
+
+        self.slots = dict() # Node index: slot
+        self.node_indexes = array(KEY_TYPECODE) # Slot: node index
+        self.neighbours = array('i') # slot * max_degree + i: slot of the i-th neighbour
+        self.edge_ids = array('i') # slot * max_degree + i: edge to the i-th neighbour
+        self.weights = array('d') # Edge id: pheromone at the iteration of its stamp
+        self.stamps = array('L') # Edge id: iteration its weight was written at
+
+        self.iteration = 0 # Number of evaporations
+        self.rate = None # Evaporation rate
+        self.decays = [1.0] # k: (1 - rate)^k
+        self.bounds = None # (minimum, maximum) pheromone of an edge, see MaxMinAntSystem
+
+    def __len__(self):
+
+        return len(self.node_indexes)
+
+    def __contains__(self, node_index):
+
+        return node_index in self.slots
+
+    def number_of_edges(self):
+
+        return len(self.weights)
+
+    def add_node(self, node_index):
+
+        ''' Adds the node if it is not there yet. Returns its slot '''
+
+        slot = self.slots.get(node_index)
+
+        if slot is None:
+            slot = len(self.node_indexes)
+            self.slots[node_index] = slot
+            self.node_indexes.append(node_index)
+            self.neighbours.extend([NO_NEIGHBOUR] * self.max_degree)
+            self.edge_ids.extend([NO_NEIGHBOUR] * self.max_degree)
+
+        return slot
+
+    def _link(self, slot, other_slot, edge_id):
+
+        base = slot * self.max_degree
+
+        for position in range(base, base + self.max_degree):
+            if self.neighbours[position] == NO_NEIGHBOUR:
+                self.neighbours[position] = other_slot
+                self.edge_ids[position] = edge_id
+                return
+
+        raise ValueError("Node " + str(self.node_indexes[slot]) + " already has " + str(self.max_degree) + " neighbours")
+
+    def _edge_id(self, slot, other_slot):
+
+        base = slot * self.max_degree
+
+        for position in range(base, base + self.max_degree):
+            if self.neighbours[position] == other_slot:
+                return self.edge_ids[position]
+
+        return NO_NEIGHBOUR
+
+    def add_edge(self, node_index, other_node_index, weight):
+
+        ''' Adds both nodes and the edge between them if they are not there yet.
+            An existing edge keeps its pheromone. Returns the edge id
+        '''
+
+        slot = self.add_node(node_index)
+        other_slot = self.add_node(other_node_index)
+
+        edge_id = self._edge_id(slot, other_slot)
+
+        if edge_id == NO_NEIGHBOUR:
+            edge_id = len(self.weights)
+            self.weights.append(weight)
+            self.stamps.append(self.iteration)
+            self._link(slot, other_slot, edge_id)
+            self._link(other_slot, slot, edge_id)
+
+        return edge_id
+
+    def expand(self, node_index, successors, weight):
+
+        ''' expand
+            Parameters:
+            node_index
+            successors: node indexes of the successors of node_index
+            weight: pheromone of the new edges
+
+            Makes sure the node is joined to every successor.
+            Returns the list of (successor node index, edge id)
+        '''
+
+        edges = list()
+
+        for successor in successors:
+            edges.append((successor, self.add_edge(node_index, successor, weight)))
+
+        return edges
+
+    def weight(self, edge_id):
+
+        ''' Pheromone of an edge now '''
+
+        weight = self.weights[edge_id] * self.decays[self.iteration - self.stamps[edge_id]]
+
+        if self.bounds is not None:
+            if weight < self.bounds[0]:
+                return self.bounds[0]
+            if weight > self.bounds[1]:
+                return self.bounds[1]
+
+        return weight
+
+    def set_weight(self, edge_id, weight):
+
+        # Stored within the bounds too, so a deposit over tau_max does not have to evaporate first
+        if self.bounds is not None:
+            weight = min(max(weight, self.bounds[0]), self.bounds[1])
+
+        self.weights[edge_id] = weight
+        self.stamps[edge_id] = self.iteration
+
+    def edge_id(self, node_index, other_node_index):
+
+        ''' Id of the edge between both nodes, NO_NEIGHBOUR if there is none '''
+
+        slot = self.slots.get(node_index)
+        other_slot = self.slots.get(other_node_index)
+
+        if slot is None or other_slot is None:
+            return NO_NEIGHBOUR
+
+        return self._edge_id(slot, other_slot)
+
+    def has_edge(self, node_index, other_node_index):
+
+        return self.edge_id(node_index, other_node_index) != NO_NEIGHBOUR
+
+    def neighbours_of(self, node_index):
+
+        ''' List of (neighbour node index, edge id) of a node '''
+
+        base = self.slots[node_index] * self.max_degree
+        neighbours = list()
+
+        for position in range(base, base + self.max_degree):
+
+            other_slot = self.neighbours[position]
+
+            if other_slot != NO_NEIGHBOUR:
+                neighbours.append((self.node_indexes[other_slot], self.edge_ids[position]))
+
+        return neighbours
+
+    def shortest_path(self, sources, targets):
+
+        ''' shortest_path
+            Parameters:
+            sources, targets: node indexes (iterables)
+
+            Bidirectional breadth first search over the edges we have. Returns
+            the list of node indexes of a path with the fewest edges from a
+            source to a target, None if there is none
+        '''
+
+        degree = self.max_degree
+        neighbours = self.neighbours
+
+        # Slot: slot it was reached from (itself for the sources / targets)
+        forward = dict((self.slots[n], self.slots[n]) for n in sources if n in self.slots)
+        backward = dict((self.slots[n], self.slots[n]) for n in targets if n in self.slots)
+
+        forward_frontier = list(forward)
+        backward_frontier = list(backward)
+        meeting = None
+
+        for slot in forward_frontier:
+            if slot in backward:
+                meeting = slot
+
+        while meeting is None and forward_frontier and backward_frontier:
+
+            # A whole level of the smaller side
+            if len(forward_frontier) > len(backward_frontier):
+                forward, backward = backward, forward
+                forward_frontier, backward_frontier = backward_frontier, forward_frontier
+                swapped = True
+            else:
+                swapped = False
+
+            frontier = list()
+
+            for slot in forward_frontier:
+
+                for position in range(slot * degree, slot * degree + degree):
+
+                    other_slot = neighbours[position]
+
+                    if other_slot == NO_NEIGHBOUR or other_slot in forward:
+                        continue
+
+                    forward[other_slot] = slot
+                    frontier.append(other_slot)
+
+                    if other_slot in backward:
+                        meeting = other_slot
+                        break
+
+                if meeting is not None:
+                    break
+
+            forward_frontier = frontier
+
+            if swapped:
+                forward, backward = backward, forward
+                forward_frontier, backward_frontier = backward_frontier, forward_frontier
+
+        if meeting is None:
+            return None
+
+        path = [meeting]
+
+        while forward[path[-1]] != path[-1]:
+            path.append(forward[path[-1]])
+
+        path.reverse()
+
+        while backward[path[-1]] != path[-1]:
+            path.append(backward[path[-1]])
+
+        return [self.node_indexes[slot] for slot in path]
+
+    def edges(self):
+
+        ''' Generator of (node index, other node index, edge id), each edge once '''
+
+        for slot in range(len(self.node_indexes)):
+
+            base = slot * self.max_degree
+
+            for position in range(base, base + self.max_degree):
+
+                other_slot = self.neighbours[position]
+
+                if other_slot != NO_NEIGHBOUR and slot < other_slot:
+                    yield (self.node_indexes[slot], self.node_indexes[other_slot], self.edge_ids[position])
+
+    def deposit(self, path, amount):
+
+        ''' Adds amount of pheromone on every edge of path (a list of node indexes) '''
+
+        for i in range(len(path) - 1):
+
+            edge_id = self.edge_id(path[i], path[i + 1])
+
+            if edge_id != NO_NEIGHBOUR:
+                self.set_weight(edge_id, self.weight(edge_id) + amount)
+
+    def evaporate(self, rate):
+
+        ''' Every edge loses rate of its pheromone. It only counts an iteration
+            (see weight), unless the rate changes: then every edge is brought
+            up to date first
+        '''
+
+        if rate != self.rate:
+
+            for edge_id in range(len(self.weights)):
+                self.set_weight(edge_id, self.weight(edge_id))
+
+            self.rate = rate
+            self.decays = [1.0]
+            self.iteration = 0
+            self.stamps = array('L', [0]) * len(self.weights)
+
+        self.iteration += 1
+        self.decays.append(self.decays[-1] * (1 - rate))
+
+    def reset(self, weight):
+
+        ''' Every edge gets weight '''
+
+        self.weights = array('d', [weight]) * len(self.weights)
+        self.stamps = array('L', [self.iteration]) * len(self.weights)
+
+    def prune(self, threshold, protected=(), limit=None):
+
+        ''' prune
+            Parameters:
+            threshold: pheromone at or under which an edge is forgotten
+            protected: node indexes never removed
+            limit: most nodes to keep, None for no limit. The protected ones
+            count against it, and the rest are kept by their strongest edge
+
+            Removes every node (not protected) whose edges all have threshold
+            pheromone or less, with its edges, and compacts the arrays.
+            Slots and edge ids change, so nobody may hold one across this.
+            Returns the number of nodes removed
+        '''
+
+        degree = self.max_degree
+        number_of_slots = len(self.node_indexes)
+
+        keep = bytearray(number_of_slots)
+        strongest = list() # (strongest edge, slot) of the nodes not protected over threshold
+
+        for slot in range(number_of_slots):
+
+            if self.node_indexes[slot] in protected:
+                keep[slot] = 1
+                continue
+
+            weight = max(self.weight(self.edge_ids[position]) if self.neighbours[position] != NO_NEIGHBOUR else 0.0
+                         for position in range(slot * degree, slot * degree + degree))
+
+            if weight > threshold:
+                strongest.append((weight, slot))
+
+        if limit is not None:
+            strongest.sort(key=lambda node: (-node[0], node[1]))
+            del strongest[max(limit - sum(keep), 0):]
+
+        for _, slot in strongest:
+            keep[slot] = 1
+
+        kept = array('i', [NO_NEIGHBOUR]) * number_of_slots # Old slot: new slot
+        node_indexes = array(KEY_TYPECODE)
+
+        for slot in range(number_of_slots):
+            if keep[slot]:
+                kept[slot] = len(node_indexes)
+                node_indexes.append(self.node_indexes[slot])
+
+        removed = number_of_slots - len(node_indexes)
+
+        if removed == 0:
+            return 0
+
+        new_edge_ids = dict() # Old edge id: new edge id
+        neighbours = array('i', [NO_NEIGHBOUR]) * (len(node_indexes) * degree)
+        edge_ids = array('i', [NO_NEIGHBOUR]) * (len(node_indexes) * degree)
+        new_weights = array('d')
+
+        for slot in range(number_of_slots):
+
+            new_slot = kept[slot]
+
+            if new_slot == NO_NEIGHBOUR:
+                continue
+
+            new_position = new_slot * degree
+
+            for position in range(slot * degree, slot * degree + degree):
+
+                other_slot = self.neighbours[position]
+
+                if other_slot == NO_NEIGHBOUR or kept[other_slot] == NO_NEIGHBOUR:
+                    continue
+
+                edge_id = self.edge_ids[position]
+
+                if edge_id not in new_edge_ids:
+                    new_edge_ids[edge_id] = len(new_weights)
+                    new_weights.append(self.weight(edge_id))
+
+                neighbours[new_position] = kept[other_slot]
+                edge_ids[new_position] = new_edge_ids[edge_id]
+                new_position += 1
+
+        self.slots = dict((node_index, slot) for slot, node_index in enumerate(node_indexes))
+        self.node_indexes = node_indexes
+        self.neighbours = neighbours
+        self.edge_ids = edge_ids
+        self.weights = new_weights
+        self.stamps = array('L', [self.iteration]) * len(new_weights)
+
+        return removed
+
+    def to_networkx(self):
+
+        ''' The same graph as a networkx Graph, with 'weight' on the edges, to draw it '''
+
+        import networkx as nx
+
+        graph = nx.Graph()
+        graph.add_nodes_from(self.node_indexes)
+
+        for node_index, other_node_index, edge_id in self.edges():
+            graph.add_edge(node_index, other_node_index, weight=self.weight(edge_id))
+
+        return graph
+
@@ -1,6 +1,7 @@
 # coding=utf-8
 from acoproblem_mono import ACOProblem
-import random
+from patterndb import TILE_SUBSETS, TILE_POSITIONS, load_databases
+from cache import StateCache
 import sys
 
 '''
@@ -10,18 +11,50 @@ puzzle.py
 
 '''
 
+# Cells the hole can move to from each cell, in the order successors
+# has always returned them: down, left, up, right
+HOLE_MOVES = list()
+
+for _hole in range(16):
+    _moves = list()
+    if _hole <= 11:
+        _moves.append(_hole + 4)
+    if _hole % 4 != 0:
+        _moves.append(_hole - 1)
+    if _hole >= 4:
+        _moves.append(_hole - 4)
+    if _hole % 4 != 3:
+        _moves.append(_hole + 1)
+    HOLE_MOVES.append(tuple(_moves))
+
 class Puzzle(ACOProblem):
 
     '''
     This class overrides the generic class ACOProblem.im
     To avoid having to look for the "hole" or "empty cell" in each state.
     I am passing the index of hole each time along with the state.
-    So, our state is a pair ([state],hole)
+    So, our state is a pair (tiles,hole), where tiles is the 64 bit integer
+    with the tile of cell i in its nibble i (the same integer the graph is keyed on).
+    
+    initialPieces and solution are given as ([list of 16 tiles],hole) as always
+    and packed here. Use generateStateFromHash to show a state.
+    
+    vectorized=True moves the whole colony at once with numpy (see vectorized.py)
+    instead of ant by ant, each ant starting again after walk_limit steps.
+    
+    processes=N walks the colony in N worker processes (see parallel.py), each
+    ant giving up after walk_limit steps.
+    
+    cache_size=N keeps the successors (with their costs) of the last N or so
+    nodes expanded, see cache.py. The counters are in self.cache.
+    
+    seed=N makes the run repeatable, in any of the three ways of walking the
+    colony (see streams.py).
     '''
     
-    def __init__(self, initialPieces, solution, alpha, beta, number_of_ants, p, q0, base_attractiveness, initial_tau):
+    def __init__(self, initialPieces, solution, alpha, beta, number_of_ants, p, q0, base_attractiveness, initial_tau, max_nodes=10000000, vectorized=False, processes=None, walk_limit=10000, pdb_directory='pdb', cache_size=0, prune_nodes=None, strategy=None, seed=None):
         
-        super(Puzzle, self).__init__([initialPieces], [solution], alpha, beta, number_of_ants, p, q0, base_attractiveness, initial_tau)
+        super(Puzzle, self).__init__([self.pack_state(initialPieces)], [self.pack_state(solution)], alpha, beta, number_of_ants, p, q0, base_attractiveness, initial_tau, max_nodes, prune_nodes, strategy, seed)
         
         # Now we pass the self to every ant so they know how to expand the graph.
         
@@ -29,13 +62,18 @@ class Puzzle(ACOProblem):
             
             ant.aco_specific_problem = self
             
-        self.c0 = open('pdb/15-puzzle-663-0.db', 'rb')
-        self.c1 = open('pdb/15-puzzle-663-1.db', 'rb')
-        self.c2 = open('pdb/15-puzzle-663-2.db', 'rb')
+        # Compact (.cdb) tables are used when present, see patterndb.py
+        self.pdb0, self.pdb1, self.pdb2 = load_databases(pdb_directory)
         
-        self.ba0 = bytearray(self.c0.read())
-        self.ba1 = bytearray(self.c1.read())
-        self.ba2 = bytearray(self.c2.read())
+        self.cache = StateCache(cache_size) if cache_size else None
+        
+        if vectorized:
+            # numpy is only needed for this
+            from vectorized import VectorizedColony
+            self.colony_engine = VectorizedColony(self, walk_limit=walk_limit)
+        elif processes:
+            from parallel import ColonyPool
+            self.colony_engine = ColonyPool(self, processes, walk_limit=walk_limit)
 
 
     def objective_function(self, solution):
@@ -48,7 +86,7 @@ class Puzzle(ACOProblem):
         we want to optimize (minimize). In this case it will be the length of the solution
         '''
         if solution == None:
-            return sys.maxint
+            return sys.maxsize
         else:
             return len(solution)
 
@@ -76,14 +114,13 @@ class Puzzle(ACOProblem):
         return (self.base_attractiveness * 1.0) / len(solution)
 
     
-    def generate_node_hash(self, state):
+    def pack_state(self, state):
         
-        ''' generate_node_hash
+        ''' pack_state
             Parameters:
-            state
+            state: ([list of 16 tiles],hole)
             
-            Based on the state, we generate an unique integer hash, so we can identify uniquely
-            each node of the graph
+            Returns the packed (tiles,hole) state
         '''
         idx = 0
         state_tiles = state[0]
@@ -93,8 +130,36 @@ class Puzzle(ACOProblem):
             val = state_tiles[i]
             idx |= val << (i * 4)
 
-        return idx       
-          
+        return (idx, state[1])
+
+    def generate_node_hash(self, state):
+        
+        ''' generate_node_hash
+            Parameters:
+            state
+            
+            Based on the state, we generate an unique integer hash, so we can identify uniquely
+            each node of the graph. The packed tiles already are.
+        '''
+
+        return state[0]
+
+    def node_state(self, node_index):
+        
+        ''' node_state
+            Parameters:
+            node_index
+            
+            Returns the packed state of a node. The hole is the only nibble
+            that is 0: we and each nibble's 4 bits (negated) into its lowest bit
+        '''
+        
+        zeros = ~node_index & 0xFFFFFFFFFFFFFFFF
+        zeros &= zeros >> 1
+        zeros &= zeros >> 2
+        zeros &= 0x1111111111111111
+        
+        return (node_index, (zeros.bit_length() - 1) >> 2)
 
     def generateStateFromHash(self, hash):
         
@@ -109,12 +174,36 @@ class Puzzle(ACOProblem):
 
         return (list,list.index(0))
 
-    def calculate_cost(self, state):
-         
+    def moves(self, solution):
+
+        ''' moves
+            Parameters:
+            solution: list of node indexes
+
+            Returns the list of tiles moved (into the hole) at each step
+        '''
+
+        moves = list()
+
+        for i in range(len(solution) - 1):
+            new_hole = self.node_state(solution[i + 1])[1]
+            moves.append((solution[i] >> (new_hole << 2)) & 0xF)
+
+        return moves
+
+    def pdb_indexes(self, state):
+
+        ''' pdb_indexes
+            Parameters:
+            state
+
+            Returns the index of state in each of the 3 pattern databases
+        '''
+
         state_hash = self.generate_node_hash(state)
          
-        tile_positions = [-1, 0, 0, 1, 2, 1, 2, 0, 1, 3, 4, 2, 3, 5, 4, 5]
-        tile_subsets = [-1, 1, 0, 0, 0, 1, 1, 2, 2, 1, 1, 2, 2, 1, 2, 2]
+        tile_positions = TILE_POSITIONS
+        tile_subsets = TILE_SUBSETS
              
         index0 = 0
         index1 = 0
@@ -135,8 +224,111 @@ class Puzzle(ACOProblem):
                      
                 else:
                     index0 |= pos << (tile_positions[tile] << 2)
+
+        return (index0, index1, index2)
+
+    def calculate_cost(self, state):
+         
+        index0, index1, index2 = self.pdb_indexes(state)
                          
-        return self.ba0[index0] + self.ba1[index1] + self.ba2[index2]
+        return self.pdb0.lookup(index0) + self.pdb1.lookup(index1) + self.pdb2.lookup(index2)
+
+    def heuristic_info(self, state):
+
+        ''' heuristic_info
+            Parameters:
+            state
+
+            Returns (indexes, values): the index and value of state in each of
+            the 3 pattern databases. See successors_with_cost
+        '''
+
+        indexes = self.pdb_indexes(state)
+        values = (self.pdb0.lookup(indexes[0]), self.pdb1.lookup(indexes[1]), self.pdb2.lookup(indexes[2]))
+
+        return (indexes, values)
+
+    def successors_with_cost(self, state, info):
+
+        ''' successors_with_cost
+            Parameters:
+            state
+            info: heuristic_info of state (None to compute it)
+
+            Returns a list of (successor, successor info, successor cost).
+
+            A move takes one tile from the new hole to the old one, so only the
+            index of that tile's subset changes, and only in that tile's nibble.
+            Each successor costs one table read instead of a whole calculate_cost.
+            With a cache, nodes expanded not long ago cost nothing.
+        '''
+
+        if self.cache is not None:
+            successors = self.cache.get(state[0])
+            if successors is not None:
+                return successors
+
+        if info is None:
+            info = self.heuristic_info(state)
+
+        indexes, values = info
+        databases = (self.pdb0, self.pdb1, self.pdb2)
+        hole = state[1]
+        successors = list()
+
+        for successor in self.successors(state):
+
+            new_hole = successor[1]
+            tile = (state[0] >> (new_hole << 2)) & 0xF
+            subset = TILE_SUBSETS[tile]
+
+            new_indexes = list(indexes)
+            new_indexes[subset] ^= (hole ^ new_hole) << (TILE_POSITIONS[tile] << 2)
+
+            new_values = list(values)
+            new_values[subset] = databases[subset].lookup(new_indexes[subset])
+
+            successors.append((successor, (tuple(new_indexes), tuple(new_values)), sum(new_values)))
+
+        if self.cache is not None:
+            self.cache.put(state[0], successors)
+
+        return successors
+
+    def lower_bound(self, target):
+
+        ''' lower_bound
+            Parameters:
+            target: a state
+
+            The pattern databases only know the way to the solution. To go to
+            any other state we have the Manhattan distance, which never
+            overestimates either. Returns a function of a state that gives
+            the Manhattan distance from it to target (see idastar.py)
+        '''
+
+        target_tiles = target[0]
+        distance = [[0] * 16 for _ in range(16)] # Tile: cell: moves to its cell in target
+
+        for target_cell in range(16):
+
+            tile = (target_tiles >> (target_cell << 2)) & 0xF
+
+            if tile != 0:
+                for cell in range(16):
+                    distance[tile][cell] = abs(cell // 4 - target_cell // 4) + abs(cell % 4 - target_cell % 4)
+
+        def manhattan(state):
+
+            tiles = state[0]
+            total = 0
+
+            for cell in range(16):
+                total += distance[(tiles >> (cell << 2)) & 0xF][cell]
+
+            return total
+
+        return manhattan
 
 #     def calculate_cost(self, state):
 #          
@@ -222,53 +414,17 @@ class Puzzle(ACOProblem):
       
         ''' 
         Here we determine each state successors
-    
+        
+        The tile next to the hole moves into it: we take it out of its nibble
+        and put it in the hole's one (which is 0)
         ''' 
         
-        pieces,hole = state
+        tiles,hole = state
         successors = list()
         
-        potential_movements = dict({'up':True,'right':True,'down':True,'left':True})
-        
-        
-        # Now we eliminate the potential movements
-        
-        if hole < 4:
-            potential_movements['up'] = False
-            
-        if hole % 4 == 3:
-            potential_movements['right'] = False
-            
-        if hole > 11: 
-            potential_movements['down'] = False    
-         
-        if hole % 4 == 0: 
-            potential_movements['left'] = False 
-            
+        for new_hole in HOLE_MOVES[hole]:
             
-        if potential_movements['down']:
-            successor = pieces[:] 
-            successor[hole],successor[hole+4] = successor[hole+4],0    
-            successors.append((successor,hole+4))
-        
-
-        if potential_movements['left']:
-            successor = pieces[:]
-            successor[hole],successor[hole-1] = successor[hole-1],0
-            successors.append((successor,hole-1))
-            
-
-        if potential_movements['up']:
-            successor = pieces[:]
-            successor[hole],successor[hole-4] = successor[hole-4],0
-            successors.append((successor,hole-4))
-                        
-
-        if potential_movements['right']:
-            successor = pieces[:]
-            successor[hole],successor[hole+1] = successor[hole+1],0
-            successors.append((successor,hole+1))
-
+            tile = (tiles >> (new_hole << 2)) & 0xF
+            successors.append((tiles ^ (tile << (new_hole << 2)) ^ (tile << (hole << 2)), new_hole))
             
         return successors
-        
\ No newline at end of file
@@ -0,0 +1,135 @@
+# coding=utf-8
+import copy
+import multiprocessing
+from idastar import ida_star, NodeLimitReached
+
+'''
+reoptimize.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+Makes the solution of the colony shorter, a window at a time. The solution
+is cut in segments of window moves, and each one is replaced by the
+shortest way between its ends, which IDA* finds quickly for short segments:
+
+ - the last segment ends in the solution, so IDA* has the pattern databases
+ - any other segment ends in some state, so IDA* has problem.lower_bound
+   (the Manhattan distance for the puzzle), see idastar.py
+
+A search that expands more than node_limit nodes leaves its segment as it
+was. The segments are cut twice (from the start, and half a window later,
+so the joints are in the middle of a segment too) and everything is done
+again while the solution gets shorter.
+
+Segments do not depend on each other, so they can be searched in a pool of
+processes.
+'''
+
+# The problem of the pool processes
+_problem = None
+
+
+def _set_problem(problem):
+
+    global _problem
+    _problem = problem
+
+
+def shortest_segment(problem, start, end, last, node_limit):
+
+    ''' shortest_segment
+        Parameters:
+        problem: the ACOProblem
+        start, end: node indexes of the ends of the segment
+        last: whether end is the solution
+        node_limit: nodes IDA* may expand
+
+        Returns the node indexes of the shortest way from start to end, None
+        if IDA* gave up
+    '''
+
+    target = None if last else problem.node_state(end)
+
+    try:
+        path, _ = ida_star(problem, problem.node_state(start), node_limit=node_limit, target=target)
+    except NodeLimitReached:
+        return None
+
+    return path
+
+
+def _shortest_segment_task(task):
+
+    return shortest_segment(_problem, *task)
+
+
+def segments(solution, window, offset):
+
+    ''' Generator of (first, last) positions in solution of the segments, offset moves late '''
+
+    first = 0
+    last = offset if offset else window
+
+    while first < len(solution) - 1:
+
+        last = min(last, len(solution) - 1)
+        yield (first, last)
+        first = last
+        last = first + window
+
+
+def shorten(problem, solution, window=16, node_limit=100000, processes=None):
+
+    ''' shorten
+        Parameters:
+        problem: the ACOProblem (with its lower_bound)
+        solution: list of node indexes from a start to a solution
+        window: moves of a segment
+        node_limit: nodes IDA* may expand for a segment
+        processes: search the segments in a pool of this many processes
+
+        Returns the shorter solution (the same one if no segment got shorter)
+    '''
+
+    # One move can not get shorter, and with no moves segments would never get past the start
+    if window < 2:
+        raise ValueError("The window must be at least 2 moves, got " + str(window))
+
+    pool = None
+
+    if processes and processes > 1:
+        # The colony is left behind when pickling (see ACOProblem.__getstate__), and so is the graph
+        worker_problem = copy.copy(problem)
+        worker_problem.global_graph = None
+        pool = multiprocessing.Pool(processes, _set_problem, (worker_problem,))
+        search = pool.map
+    else:
+        _set_problem(problem)
+        search = map
+
+    solution = list(solution)
+
+    try:
+        improved = True
+
+        while improved:
+
+            improved = False
+
+            for offset in (0, window // 2):
+
+                cuts = list(segments(solution, window, offset))
+                tasks = [(solution[first], solution[last], last == len(solution) - 1, node_limit) for first, last in cuts]
+
+                # From the end, so the positions of the rest do not change
+                for (first, last), path in reversed(list(zip(cuts, search(_shortest_segment_task, tasks)))):
+                    if path is not None and len(path) < last - first + 1:
+                        solution[first:last + 1] = path
+                        improved = True
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    return solution
+
@@ -0,0 +1,167 @@
+# coding=utf-8
+from __future__ import division, print_function
+import argparse
+import json
+import os
+import sys
+from patterndb import load_databases
+from pheromone import PheromoneStore
+from solver import DEFAULT_PARAMETERS, parse_instance, solve
+
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+
+'''
+service.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+Long running solver. It reads requests as JSON lines and writes a JSON line
+per result, so the databases are mapped (and the modules imported) once
+instead of once per puzzle.
+
+A request has the 16 tiles, row by row with 0 for the hole, and optionally
+an id (copied to the result) and any of the solver parameters:
+
+    {"id": "a", "tiles": [2, 1, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 15, 14, 0], "number_of_ants": 40}
+
+The result is the one of solver.solve plus the id, or the id and an error:
+
+    {"id": "a", "iterations": 6, "length": 3, "moves": [15, 14, 15], "nodes": 0, "optimal": false, "solved": true, "time": 0.1}
+    {"error": "An instance must have the tiles 0 to 15, got [1, 2]", "id": "b"}
+
+Every puzzle has the same solution, so the pheromone left by a request is a
+good start for the next ones: the service keeps one graph for all of them
+(up to max_warm_nodes nodes, then it starts over). Only the ant by ant colony
+uses it.
+
+Usage:
+    python service.py < requests.jsonl             # stdin to stdout
+    python service.py --socket /tmp/puzzle.sock    # one client after another
+'''
+
+
+class Service(object):
+
+    ''' service
+        Parameters:
+        pdb_directory: where the pattern databases are
+        warm: keep the pheromone between requests
+        max_warm_nodes: nodes of the kept graph over which it is dropped
+    '''
+
+    def __init__(self, pdb_directory='pdb', warm=True, max_warm_nodes=1000000):
+
+        self.pdb_directory = pdb_directory
+        self.warm = warm
+        self.max_warm_nodes = max_warm_nodes
+        self.graph = None
+
+        # Mapped now, before the first request
+        load_databases(pdb_directory)
+
+    def handle(self, line):
+
+        ''' Returns the result of a request line (a dictionary), None for a blank line '''
+
+        if not line.strip():
+            return None
+
+        request_id = None
+
+        try:
+            request = json.loads(line)
+            request_id = request.pop('id', None)
+            tiles = request.pop('tiles')
+
+            for name in request:
+                if name not in DEFAULT_PARAMETERS:
+                    raise ValueError("Unknown parameter " + name)
+
+            instance = parse_instance(' '.join(str(t) for t in tiles))
+
+            if instance is None:
+                raise ValueError("No tiles")
+
+            if self.warm and (self.graph is None or len(self.graph) > self.max_warm_nodes):
+                self.graph = PheromoneStore()
+
+            result = solve(instance, self.pdb_directory, self.graph if self.warm else None, **request)
+
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            result = {'error': str(e)}
+
+        result['id'] = request_id
+
+        return result
+
+    def serve(self, lines, output):
+
+        ''' Answers every request line of lines (a file) on output, as they come '''
+
+        for line in iter(lines.readline, ''):
+
+            result = self.handle(line)
+
+            if result is not None:
+                output.write(json.dumps(result, sort_keys=True) + '\n')
+                output.flush()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+
+        for line in iter(self.rfile.readline, b''):
+
+            result = self.server.service.handle(line.decode('utf-8'))
+
+            if result is not None:
+                self.wfile.write((json.dumps(result, sort_keys=True) + '\n').encode('utf-8'))
+                self.wfile.flush()
+
+
+def serve_unix_socket(service, path):
+
+    ''' Answers the clients of a Unix socket, one after another, until interrupted '''
+
+    if os.path.exists(path):
+        os.remove(path)
+
+    server = socketserver.UnixStreamServer(path, _RequestHandler)
+    server.service = service
+
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        os.remove(path)
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Solves 15 puzzles sent as JSON lines")
+    parser.add_argument('--socket', default=None, help="Listen on this Unix socket instead of stdin")
+    parser.add_argument('--pdb-directory', default='pdb', help="Where the pattern databases are (default: pdb)")
+    parser.add_argument('--cold', action='store_true', help="Start every request with a new pheromone graph")
+    parser.add_argument('--max-warm-nodes', type=int, default=1000000,
+                        help="Start over when the kept graph grows over this (default: 1000000)")
+    args = parser.parse_args(argv)
+
+    service = Service(args.pdb_directory, not args.cold, args.max_warm_nodes)
+
+    try:
+        if args.socket is None:
+            service.serve(sys.stdin, sys.stdout)
+        else:
+            serve_unix_socket(service, args.socket)
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
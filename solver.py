@@ -0,0 +1,290 @@
+# coding=utf-8
+from __future__ import division, print_function
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+from idastar import ida_star
+from patterndb import load_databases
+from puzzle import HOLE_MOVES, Puzzle
+from reoptimize import shorten
+from strategies import make_strategy
+
+'''
+solver.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+Solves many puzzles in a pool of processes. Every process maps the pattern
+databases once (the pages are shared by all of them, see patterndb.py) and
+then solves one instance after another.
+
+An instance is a line with the 16 tiles, row by row, 0 being the hole:
+
+    2 1 3 4 5 6 7 8 9 10 11 12 13 15 14 0
+
+Results come out as JSON lines, in the order the instances are solved:
+
+    {"id": 0, "iterations": 6, "length": 3, "moves": [15, 14, 15], "nodes": 0, "optimal": false, "solved": true, "time": 0.1}
+
+--mode exact solves them with IDA* instead of the colony, and --mode hybrid
+with the colony first and IDA* after (see MODES). --window N makes the
+colony's solution shorter N moves at a time (see reoptimize.py).
+
+Usage:
+    python solver.py instances.txt --processes 4 > results.jsonl
+    python solver.py - < instances.txt
+'''
+
+SOLUTION = ([1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 0], 15)
+
+# Parameters of Puzzle and run
+DEFAULT_PARAMETERS = {
+    'alpha': 1.0,
+    'beta': 2.0,
+    'number_of_ants': 20,
+    'p': 0.1,
+    'q0': 0.5,
+    'base_attractiveness': 1.0,
+    'initial_tau': 0.1,
+    'max_nodes': 10000000,
+    'cache_size': 0,
+    'prune_nodes': 0,
+    'same_results_condition': 5,
+    'mode': 'aco',
+    'strategy': 'best',
+    'seed': None,
+    'window': 0,
+}
+
+# aco: the colony alone
+# exact: IDA* alone, optimal
+# hybrid: the colony, then IDA* looking only for solutions shorter than the
+#         colony's; optimal, and the graph keeps the better one if any
+MODES = ('aco', 'exact', 'hybrid')
+
+
+def solvable(tiles):
+
+    ''' Whether SOLUTION can be reached from the 16 tiles (0 being the hole).
+        A move of the hole up or down takes a tile over the 3 between, so the
+        parity of the inversions plus the row of the hole never changes, and
+        it is odd for SOLUTION (no inversions, hole in row 3)
+    '''
+
+    numbers = [t for t in tiles if t != 0]
+    inversions = sum(1 for i in range(len(numbers)) for j in range(i + 1, len(numbers)) if numbers[i] > numbers[j])
+
+    return (inversions + tiles.index(0) // 4) % 2 == 1
+
+
+def scramble(depth, random):
+
+    ''' ([list of 16 tiles],hole) of a random walk of depth moves from SOLUTION
+        (random being a random.Random), never going straight back
+    '''
+
+    tiles = list(SOLUTION[0])
+    hole = SOLUTION[1]
+    last = None
+
+    for _ in range(depth):
+
+        cell = random.choice([c for c in HOLE_MOVES[hole] if c != last])
+        tiles[hole], tiles[cell] = tiles[cell], tiles[hole]
+        last = hole
+        hole = cell
+
+    return (tiles, hole)
+
+
+def parse_instance(line):
+
+    ''' Returns the ([list of 16 tiles],hole) state of an instance line, None for blank and # lines '''
+
+    line = line.split('#')[0].replace(',', ' ').split()
+
+    if len(line) == 0:
+        return None
+
+    tiles = [int(t) for t in line]
+
+    if sorted(tiles) != list(range(16)):
+        raise ValueError("An instance must have the tiles 0 to 15, got " + str(tiles))
+
+    # Otherwise IDA* would never stop, nor the colony before max_nodes
+    if not solvable(tiles):
+        raise ValueError("The instance can not be solved: " + str(tiles))
+
+    return (tiles, tiles.index(0))
+
+
+def read_instances(lines):
+
+    ''' Generator of the states of the instance lines '''
+
+    for line in lines:
+
+        instance = parse_instance(line)
+
+        if instance is not None:
+            yield instance
+
+
+def puzzle_parameters(parameters):
+
+    ''' puzzle_parameters
+        Parameters:
+        parameters: overrides of DEFAULT_PARAMETERS
+
+        Returns (Puzzle keyword arguments, same_results_condition, mode, window),
+        the strategy made from its name and prune_nodes 0 turned into None
+    '''
+
+    parameters = dict(DEFAULT_PARAMETERS, **parameters)
+    same_results_condition = parameters.pop('same_results_condition')
+    mode = parameters.pop('mode')
+    window = parameters.pop('window')
+    # 0 means never, as for cache_size
+    parameters['prune_nodes'] = parameters['prune_nodes'] or None
+    parameters['strategy'] = make_strategy(parameters['strategy'])
+
+    return (parameters, same_results_condition, mode, window)
+
+
+def solve(instance, pdb_directory='pdb', graph=None, **parameters):
+
+    ''' solve
+        Parameters:
+        instance: ([list of 16 tiles],hole)
+        pdb_directory: where the pattern databases are
+        graph: PheromoneStore of previous runs to start from (see ACOProblem.run)
+        parameters: overrides of DEFAULT_PARAMETERS
+
+        Returns a dictionary with solved, length (number of moves), moves
+        (the tile moved at each step), optimal, time, iterations (of the
+        colony) and nodes (expanded by IDA*)
+    '''
+
+    parameters, same_results_condition, mode, window = puzzle_parameters(parameters)
+
+    if mode not in MODES:
+        raise ValueError("Unknown mode " + str(mode) + ", it must be one of " + ", ".join(MODES))
+
+    # 0 means no reoptimization
+    if window and window < 2:
+        raise ValueError("The window must be at least 2 moves (or 0 for none), got " + str(window))
+
+    start = time.time()
+
+    puzzle = Puzzle(instance, SOLUTION, pdb_directory=pdb_directory, **parameters)
+    puzzle.verbose = False
+    solution = None
+    nodes = 0
+
+    if mode != 'exact':
+        solution = puzzle.run(same_results_condition, graph)
+
+        # run gives us the last solution, we want the best one
+        if solution:
+            solution = puzzle.global_best_solution
+
+        if solution and window:
+            shorter = shorten(puzzle, solution, window)
+            if len(shorter) < len(solution):
+                puzzle.reinforce(shorter)
+                solution = shorter
+
+    if mode != 'aco':
+        upper_bound = len(solution) - 1 if solution else None
+        better, nodes = ida_star(puzzle, puzzle.initial_states[0], upper_bound)
+
+        if better is not None:
+            if mode == 'hybrid':
+                puzzle.reinforce(better)
+            solution = better
+
+    result = dict()
+    result['solved'] = bool(solution)
+    result['optimal'] = bool(solution) and mode != 'aco'
+    result['nodes'] = nodes
+    result['length'] = len(solution) - 1 if solution else None
+    result['moves'] = puzzle.moves(solution) if solution else None
+    result['time'] = time.time() - start
+    result['iterations'] = puzzle.iterations
+
+    return result
+
+
+def _load_databases(pdb_directory):
+
+    # Pool initializer: every worker maps the tables before its first instance
+    load_databases(pdb_directory)
+
+
+def _solve_task(task):
+
+    number, instance, pdb_directory, parameters = task
+
+    result = solve(instance, pdb_directory, **parameters)
+    result['id'] = number
+
+    return result
+
+
+def solve_many(instances, processes=None, pdb_directory='pdb', **parameters):
+
+    ''' solve_many
+        Parameters:
+        instances: iterable of ([list of 16 tiles],hole)
+        processes: worker processes (defaults to every core)
+        pdb_directory: where the pattern databases are
+        parameters: overrides of DEFAULT_PARAMETERS
+
+        Generator of the results of solve, each one with the id (position in
+        instances) of its instance, as soon as they are solved
+    '''
+
+    tasks = ((number, instance, pdb_directory, parameters) for number, instance in enumerate(instances))
+
+    pool = multiprocessing.Pool(processes or multiprocessing.cpu_count(), _load_databases, (pdb_directory,))
+
+    try:
+        for result in pool.imap_unordered(_solve_task, tasks):
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Solves the 15 puzzles of a file, one per line")
+    parser.add_argument('instances', help="File with one instance per line (- for stdin)")
+    parser.add_argument('--processes', type=int, default=None, help="Worker processes (default: every core)")
+    parser.add_argument('--pdb-directory', default='pdb', help="Where the pattern databases are (default: pdb)")
+
+    for name, value in sorted(DEFAULT_PARAMETERS.items()):
+        # Only the seed has no value by default, and it is an integer
+        parser.add_argument('--' + name.replace('_', '-'), type=int if value is None else type(value), default=value,
+                            help="(default: " + str(value) + ")")
+
+    args = parser.parse_args(argv)
+    parameters = dict((name, getattr(args, name)) for name in DEFAULT_PARAMETERS)
+
+    f = sys.stdin if args.instances == '-' else open(args.instances)
+
+    try:
+        for result in solve_many(read_instances(f), args.processes, args.pdb_directory, **parameters):
+            print(json.dumps(result, sort_keys=True))
+            sys.stdout.flush()
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+# coding=utf-8
+from __future__ import division, print_function
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+'''
+startup.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+Startup benchmark: how long a fresh process takes to get through its first
+iteration. Each run is a new python process, so imports and the mapping of
+the databases are paid every time, as in a short batch job. It reports
+(median of the runs, in seconds):
+
+ - imports: importing puzzle (and everything it imports)
+ - databases: creating the Puzzle, which maps the pattern databases
+ - first_iteration: the first generate_ant_solutions of the colony
+ - total: from the start of the process to the end of the first iteration
+
+and whether networkx or matplotlib got imported on the way (they should not).
+
+Usage:
+    python startup.py --runs 10
+'''
+
+# A couple of moves away, so the first iteration is short and startup shows
+INSTANCE = ([1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 0, 15], 14)
+
+
+def first_iteration(pdb_directory='pdb'):
+
+    ''' Runs in the measured process. Returns its timings (a dictionary) '''
+
+    start = time.time()
+
+    from puzzle import Puzzle
+    from solver import SOLUTION, puzzle_parameters
+
+    imported = time.time()
+
+    parameters = puzzle_parameters(dict())[0]
+    puzzle = Puzzle(INSTANCE, SOLUTION, pdb_directory=pdb_directory, **parameters)
+
+    created = time.time()
+
+    puzzle.initial_graph_creation()
+    puzzle.generate_ant_solutions_mono()
+
+    iterated = time.time()
+
+    return {
+        'imports': imported - start,
+        'databases': created - imported,
+        'first_iteration': iterated - created,
+        'heavy_modules': sorted(m for m in ('networkx', 'matplotlib') if m in sys.modules),
+    }
+
+
+def median(values):
+
+    ''' Median of values, None if there are none '''
+
+    values = sorted(values)
+    middle = len(values) // 2
+
+    if len(values) == 0:
+        return None
+
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+
+def benchmark(runs=5, pdb_directory='pdb'):
+
+    ''' benchmark
+        Parameters:
+        runs: number of fresh processes to time
+
+        Returns the median timings of the runs
+    '''
+
+    timings = list()
+
+    for _ in range(runs):
+
+        start = time.time()
+        output = subprocess.check_output([sys.executable, __file__, '--once', '--pdb-directory', pdb_directory])
+        total = time.time() - start
+
+        timing = json.loads(output.decode('utf-8'))
+        timing['total'] = total
+        timings.append(timing)
+
+    result = dict((name, median([t[name] for t in timings])) for name in ('imports', 'databases', 'first_iteration', 'total'))
+    result['heavy_modules'] = sorted(set(m for t in timings for m in t['heavy_modules']))
+    result['runs'] = runs
+
+    return result
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Measures the time to the first iteration of a fresh process")
+    parser.add_argument('--runs', type=int, default=5, help="Fresh processes to time (default: 5)")
+    parser.add_argument('--pdb-directory', default='pdb', help="Where the pattern databases are (default: pdb)")
+    parser.add_argument('--once', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.once:
+        print(json.dumps(first_iteration(args.pdb_directory)))
+    else:
+        print(json.dumps(benchmark(args.runs, args.pdb_directory), sort_keys=True))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
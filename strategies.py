@@ -0,0 +1,218 @@
+# coding=utf-8
+from pheromone import NO_NEIGHBOUR
+
+'''
+strategies.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+Pheromone update strategies of the ant by ant colony. ACOProblem.strategy
+decides the local update (Ant.move_ant, every move) and the global update
+(ACOProblem.pheromone_update, once per iteration):
+
+ - BestAnt: what we always had. Local update towards initial_tau, every edge
+   evaporates and the best ant of the iteration deposits Q / length.
+ - ColonySystem (ACS): the same local update, but the global update only
+   touches the edges of the best path (iteration or global best), moving
+   them towards Q / length. Nothing else evaporates.
+ - MaxMinAntSystem (MMAS): no local update, every edge evaporates, the best
+   ant deposits, and pheromone is kept within [tau_min, tau_max]. When the
+   best solution has not improved for restart_after iterations every edge
+   goes back to tau_max.
+ - RankBasedAntSystem: every edge evaporates, the r-th of the ranks - 1 best
+   ants of the iteration deposits (ranks - r) * Q / length, and the best so
+   far ranks * Q / length.
+
+Use make_strategy to get one by name ('best', 'acs', 'mmas', 'rank').
+'''
+
+
+class Strategy(object):
+
+    ''' Base strategy: local update towards initial_tau, no global update '''
+
+    def __init__(self):
+
+        self.best_solution = None # Best solution seen by this strategy
+        self.stagnation = 0 # Iterations since the best solution improved
+
+    def local_update(self, problem, graph, edge_id):
+
+        ''' After an ant crosses the edge '''
+
+        graph.set_weight(edge_id, graph.weight(edge_id) * (1 - problem.p) + problem.p * problem.initial_tau)
+
+    def global_update(self, problem, graph, solutions):
+
+        ''' global_update
+            Parameters:
+            problem: the ACOProblem
+            graph: its PheromoneStore
+            solutions: paths of the ants that found a solution this iteration
+        '''
+
+        pass
+
+    def track(self, iteration_best):
+
+        ''' Keeps the best solution so far and the stagnation count '''
+
+        if self.best_solution is None or len(iteration_best) < len(self.best_solution):
+            self.best_solution = iteration_best
+            self.stagnation = 0
+        else:
+            self.stagnation += 1
+
+
+class BestAnt(Strategy):
+
+    ''' The default: evaporation everywhere and the best ant of the iteration deposits '''
+
+    def global_update(self, problem, graph, solutions):
+
+        best = min(solutions, key=len)
+        self.track(best)
+
+        graph.evaporate(problem.p)
+        graph.deposit(best, problem.pheromone_update_criteria(best))
+
+
+class ColonySystem(Strategy):
+
+    ''' colony system
+        Parameters:
+        best: 'iteration' (the best ant of the iteration) or 'global' (the
+        best solution so far) gives the global update
+    '''
+
+    def __init__(self, best='iteration'):
+
+        Strategy.__init__(self)
+
+        if best not in ('iteration', 'global'):
+            raise ValueError("best must be 'iteration' or 'global'")
+
+        self.best = best
+
+    def global_update(self, problem, graph, solutions):
+
+        best = min(solutions, key=len)
+        self.track(best)
+
+        if self.best == 'global':
+            best = self.best_solution
+
+        amount = problem.pheromone_update_criteria(best)
+
+        for i in range(len(best) - 1):
+
+            edge_id = graph.edge_id(best[i], best[i + 1])
+
+            if edge_id != NO_NEIGHBOUR:
+                graph.set_weight(edge_id, graph.weight(edge_id) * (1 - problem.p) + problem.p * amount)
+
+
+class MaxMinAntSystem(Strategy):
+
+    ''' max min ant system
+        Parameters:
+        tau_min, tau_max: bounds of the pheromone. By default tau_max is
+        Q / (p * length of the best solution so far) and tau_min min_ratio of it
+        best: 'iteration' or 'global', the solution that deposits
+        restart_after: iterations without improvement before a restart
+    '''
+
+    def __init__(self, tau_min=None, tau_max=None, min_ratio=0.01, best='iteration', restart_after=50):
+
+        Strategy.__init__(self)
+
+        if best not in ('iteration', 'global'):
+            raise ValueError("best must be 'iteration' or 'global'")
+
+        self.tau_min = tau_min
+        self.tau_max = tau_max
+        self.min_ratio = min_ratio
+        self.best = best
+        self.restart_after = restart_after
+        self.restarts = 0
+
+    def local_update(self, problem, graph, edge_id):
+
+        # MMAS has no local update
+        pass
+
+    def bounds(self, problem):
+
+        tau_max = self.tau_max
+        if tau_max is None:
+            tau_max = problem.pheromone_update_criteria(self.best_solution) / problem.p
+
+        tau_min = self.tau_min
+        if tau_min is None:
+            tau_min = tau_max * self.min_ratio
+
+        return (tau_min, tau_max)
+
+    def global_update(self, problem, graph, solutions):
+
+        best = min(solutions, key=len)
+        self.track(best)
+
+        if self.best == 'global':
+            best = self.best_solution
+
+        # weight() and set_weight() keep every edge within the bounds from now on
+        graph.bounds = self.bounds(problem)
+
+        if self.stagnation >= self.restart_after:
+            graph.reset(graph.bounds[1])
+            self.stagnation = 0
+            self.restarts += 1
+            return
+
+        graph.evaporate(problem.p)
+        graph.deposit(best, problem.pheromone_update_criteria(best))
+
+
+class RankBasedAntSystem(Strategy):
+
+    ''' rank based ant system
+        Parameters:
+        ranks: w, the best so far (w * Q / length) plus the w - 1 best ants of
+        the iteration ((w - r) * Q / length for the r-th) deposit
+    '''
+
+    def __init__(self, ranks=6):
+
+        Strategy.__init__(self)
+        self.ranks = ranks
+
+    def global_update(self, problem, graph, solutions):
+
+        ranked = sorted(solutions, key=len)
+        self.track(ranked[0])
+
+        graph.evaporate(problem.p)
+
+        for r, solution in enumerate(ranked[:self.ranks - 1]):
+            graph.deposit(solution, (self.ranks - 1 - r) * problem.pheromone_update_criteria(solution))
+
+        graph.deposit(self.best_solution, self.ranks * problem.pheromone_update_criteria(self.best_solution))
+
+
+STRATEGIES = {
+    'best': BestAnt,
+    'acs': ColonySystem,
+    'mmas': MaxMinAntSystem,
+    'rank': RankBasedAntSystem,
+}
+
+
+def make_strategy(name, **parameters):
+
+    ''' A new strategy by name (see STRATEGIES), with its parameters '''
+
+    if name not in STRATEGIES:
+        raise ValueError("Unknown strategy " + str(name) + ", it must be one of " + ", ".join(sorted(STRATEGIES)))
+
+    return STRATEGIES[name](**parameters)
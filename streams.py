@@ -0,0 +1,52 @@
+# coding=utf-8
+import random
+
+'''
+streams.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+Seeded random number streams. A run has one seed, and everything that draws
+random numbers (each ant, the ant placement, the vectorized colony) gets its
+own generator from the seed and a stream number. So a run with a seed gives
+the same numbers whatever the order ants move in or the process they move
+in, and two runs with the same seed give the same results.
+
+Without a seed every stream is seeded by the system, as we always had.
+'''
+
+MASK_64 = 0xFFFFFFFFFFFFFFFF
+
+# Streams that are not an ant (ants are 0 to number_of_ants - 1)
+PLACEMENT_STREAM = -1
+VECTORIZED_STREAM = -2
+
+
+def stream_seed(seed, stream):
+
+    ''' 64 bit seed of a stream of a run. It mixes both with splitmix64, so
+        close seeds or streams give unrelated generators
+    '''
+
+    z = (seed * 0x9E3779B97F4A7C15 + stream) & MASK_64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK_64
+
+    return z ^ (z >> 31)
+
+
+def random_stream(seed, stream):
+
+    ''' random_stream
+        Parameters:
+        seed: seed of the run, None for a system seeded generator
+        stream: number of the stream (the ant id, or one of the *_STREAM)
+
+        Returns a random.Random of its own
+    '''
+
+    if seed is None:
+        return random.Random()
+
+    return random.Random(stream_seed(seed, stream))
+
@@ -28,7 +28,7 @@ if solution == None:
 else:
     mostrar_solucion = ""
     for s in solution:
-        mostrar_solucion += str(s[0])+","
+        mostrar_solucion += str(s)+","
     print("Solution found in "+ str(end-start) + " seconds")
     print("View solution in:")
     print("http://ratslap.com/hormigas/")
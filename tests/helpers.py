@@ -0,0 +1,41 @@
+# coding=utf-8
+import os
+import random
+import unittest
+
+'''
+helpers.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+What the tests share: where the pattern databases are, and instances.
+'''
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PDB_DIRECTORY = os.path.join(ROOT, 'pdb')
+
+SOLUTION = ([1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 0], 15)
+
+# The two 6 tile tables are generated locally (see pdb_generator.py)
+HAVE_DATABASES = all(os.path.exists(os.path.join(PDB_DIRECTORY, '15-puzzle-663-' + str(n) + '.cdb')) or
+                     os.path.exists(os.path.join(PDB_DIRECTORY, '15-puzzle-663-' + str(n) + '.db')) for n in (1, 2))
+
+needs_databases = unittest.skipUnless(HAVE_DATABASES, "the pattern databases are not generated (python pdb_generator.py)")
+
+
+def puzzle(state=SOLUTION, number_of_ants=1, alpha=1.0, beta=2.0, **parameters):
+
+    ''' A Puzzle from state with the parameters of solver.py '''
+
+    from puzzle import Puzzle
+
+    return Puzzle(state, SOLUTION, alpha, beta, number_of_ants, 0.1, 0.5, 1.0, 0.1, pdb_directory=PDB_DIRECTORY, **parameters)
+
+
+def scramble(depth, seed):
+
+    ''' ([list of 16 tiles],hole) depth moves away from the solution, never straight back '''
+
+    from solver import scramble
+
+    return scramble(depth, random.Random(seed))
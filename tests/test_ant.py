@@ -0,0 +1,37 @@
+# coding=utf-8
+import unittest
+from tests.helpers import needs_databases, puzzle, scramble
+
+'''
+test_ant.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+'''
+
+
+@needs_databases
+class DecisionTableTest(unittest.TestCase):
+
+    def test_numerators_match_powers(self):
+
+        for alpha, beta in ((1.0, 2.0), (2.0, 1.0), (3.0, 3.0), (0.5, 2.5), (4.0, 7.0)):
+
+            problem = puzzle(scramble(10, 1), alpha=alpha, beta=beta)
+            problem.initial_graph_creation()
+            problem.ant_placement()
+
+            ant = problem.colony.ants[0]
+            ant.expand_node(ant.current_node_id)
+            nodes, cumulative, _ = ant.decision_table(ant.current_node_id)
+            self.assertTrue(nodes)
+
+            expected = 0.0
+
+            for (_, node, edge_id), total in zip(ant.possible_new_edges, cumulative):
+                expected += ant.graph.weight(edge_id) ** alpha * (1.0 / ant.successors_heuristic[node][2]) ** beta
+                self.assertAlmostEqual(total, expected, delta=1e-12 * expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
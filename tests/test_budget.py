@@ -0,0 +1,93 @@
+# coding=utf-8
+import unittest
+from budget import WalkBudget
+from tests.helpers import needs_databases, puzzle, scramble
+
+'''
+test_budget.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+'''
+
+
+class RecordingBudget(WalkBudget):
+
+    ''' WalkBudget that keeps the slack of every update '''
+
+    def __init__(self, *args, **kwargs):
+
+        WalkBudget.__init__(self, *args, **kwargs)
+        self.slacks = list()
+
+    def update(self, best):
+
+        WalkBudget.update(self, best)
+        self.slacks.append(self.slack)
+
+
+class WalkBudgetTest(unittest.TestCase):
+
+    def test_pruned_walks_are_not_failures(self):
+
+        budget = WalkBudget()
+        budget.update(30)
+
+        # Every restart was stopped by the bound, one ant of 20 got there
+        for _ in range(100):
+            self.assertTrue(budget.abandon(10, 10, 25))
+        budget.record(1, 20)
+        budget.update(30)
+
+        self.assertEqual(budget.slack, budget.initial_slack)
+        self.assertEqual(budget.pruned, 100)
+        self.assertEqual(budget.abandoned, 0)
+
+    def test_slack_grows_and_comes_back(self):
+
+        budget = WalkBudget()
+        budget.update(30)
+
+        for _ in range(40):
+            self.assertTrue(budget.abandon(budget.limit + 1, 10, None))
+        budget.record(0, 20)
+        budget.update(30)
+
+        self.assertEqual(budget.slack, 2 * budget.initial_slack)
+        self.assertEqual(budget.limit, 30 + budget.slack)
+
+        budget.record(1, 20)
+        budget.update(30)
+
+        self.assertEqual(budget.slack, budget.initial_slack)
+
+    def test_no_limit_before_the_first_solution(self):
+
+        budget = WalkBudget()
+        budget.record(0, 20)
+        budget.update(None)
+
+        self.assertIsNone(budget.limit)
+        self.assertFalse(budget.abandon(10 ** 6, 10 ** 6, 10 ** 6))
+
+
+@needs_databases
+class SeededRunTest(unittest.TestCase):
+
+    def test_slack_settles(self):
+
+        # The slack used to double on every walk stopped by the bound, up to max_slack
+        problem = puzzle(scramble(20, 1), number_of_ants=20, seed=42)
+        problem.verbose = False
+        budget = problem.walk_budget = RecordingBudget()
+
+        self.assertTrue(problem.run(8))
+
+        self.assertTrue(budget.slacks)
+        self.assertLessEqual(max(budget.slacks), 4 * budget.initial_slack)
+        self.assertEqual(budget.bound, len(problem.global_best_solution) - 1)
+        self.assertEqual(budget.limit, budget.bound + budget.slack)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+# coding=utf-8
+import unittest
+from cache import StateCache, PROBES
+
+'''
+test_cache.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+'''
+
+
+class StateCacheTest(unittest.TestCase):
+
+    def test_get_and_put(self):
+
+        cache = StateCache(64)
+        cache.put(5, 'five')
+
+        self.assertEqual(cache.get(5), 'five')
+        self.assertIsNone(cache.get(6))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_clock_eviction(self):
+
+        # A cache of one window: every key competes with every other
+        cache = StateCache(PROBES)
+        keys = list(range(1, PROBES + 1))
+
+        for key in keys:
+            cache.put(key, key)
+
+        self.assertEqual(len(cache), PROBES)
+
+        for new_key in range(100, 100 + PROBES):
+
+            # Used since the last sweep: it gets a second chance
+            self.assertEqual(cache.get(3), 3)
+            cache.put(new_key, new_key)
+            self.assertEqual(cache.get(new_key), new_key)
+
+        self.assertEqual(len(cache), PROBES)
+        self.assertEqual(cache.evictions, PROBES)
+        self.assertEqual(cache.get(3), 3)
+
+        # The keys nobody looked at again were the ones evicted
+        self.assertTrue(all(cache.get(key) is None for key in keys if key != 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+# coding=utf-8
+import ctypes
+import multiprocessing
+import random
+import unittest
+from parallel import CHECK_EVERY, NO_WALK, CancellableBudget, ColonyPool, ColonyWorker, PheromoneOverlay, SharedPheromones
+from tests.helpers import needs_databases, puzzle, scramble
+
+'''
+test_parallel.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+'''
+
+
+def run_pool(instance, same_results_condition=5, **pool_parameters):
+
+    ''' Runs a seeded colony in a ColonyPool of 2 workers. Returns (solution, pool) '''
+
+    max_nodes = pool_parameters.pop('max_nodes', 10000000)
+    problem = puzzle(instance, number_of_ants=10, seed=42, max_nodes=max_nodes)
+    problem.verbose = False
+    problem.colony_engine = pool = ColonyPool(problem, 2, **pool_parameters)
+
+    try:
+        solution = problem.run(same_results_condition)
+    finally:
+        pool.close()
+
+    return (problem.global_best_solution if solution else False, pool)
+
+
+class SharedPheromonesTest(unittest.TestCase):
+
+    def test_lazy_evaporation_matches_eager(self):
+
+        rng = random.Random(1)
+        shared = SharedPheromones(64, 0.1)
+        eager = dict() # Flat position: pheromone
+
+        for _ in range(200):
+
+            path = rng.sample(range(1, 20), rng.randint(2, 5))
+
+            for node_index in path:
+                if shared.row(node_index) == -1:
+                    row = shared.insert(node_index)
+                    for position in range(row * 4, row * 4 + 4):
+                        eager[position] = 0.1
+
+            forward = bytearray(rng.randrange(4) for _ in path[1:])
+            backward = bytearray(rng.randrange(4) for _ in path[1:])
+            positions = shared.merge(path, forward, backward, 0.1)
+
+            for a, b in positions:
+                eager[a] = eager[a] * 0.9 + 0.01
+                eager[b] = eager[a]
+
+            shared.evaporate(0.1)
+            for position in eager:
+                eager[position] *= 0.9
+
+            shared.deposit(positions, 1.0)
+            for a, b in positions:
+                eager[a] += 1.0
+                eager[b] = eager[a]
+
+        for position, pheromone in eager.items():
+            lazy = shared.weights[position] * shared.decay(position // 4)
+            self.assertAlmostEqual(lazy, pheromone, delta=1e-12 * max(1.0, pheromone))
+
+        # A bigger copy has the same pheromone
+        copy = shared.resized(128)
+
+        for position, pheromone in eager.items():
+            row = copy.row(shared.keys[position // 4])
+            lazy = copy.weights[row * 4 + position % 4] * copy.decay(row)
+            self.assertAlmostEqual(lazy, pheromone, delta=1e-12 * max(1.0, pheromone))
+
+
+@needs_databases
+class CancellableBudgetTest(unittest.TestCase):
+
+    def walk(self, iteration_best):
+
+        ''' One walk of a worker whose iteration already has a best walk of
+            iteration_best moves (NO_WALK for none). Returns (delta, ant, budget)
+        '''
+
+        # Its first walk gets there in 22 steps
+        problem = puzzle(([1, 2, 3, 4, 5, 10, 6, 7, 11, 13, 0, 8, 9, 14, 15, 12], 10), seed=28)
+        budget = problem.walk_budget = CancellableBudget(multiprocessing.RawValue(ctypes.c_long, iteration_best))
+        budget.start_iteration(10000, None)
+
+        worker = ColonyWorker(problem, problem.colony.ants, SharedPheromones(64, 0.1), None, None)
+        ant = problem.colony.ants[0]
+
+        return (worker.walk(ant, PheromoneOverlay(worker.shared)), ant, budget)
+
+    def test_walk_gets_there_without_a_best(self):
+
+        delta, ant, budget = self.walk(NO_WALK)
+
+        self.assertIsNotNone(delta)
+        self.assertGreater(ant.steps, CHECK_EVERY)
+        self.assertEqual(budget.cancelled, 0)
+        self.assertEqual(budget.own_best, len(ant.list_nodes_visited) - 1)
+
+    def test_best_of_another_worker_stops_the_walk(self):
+
+        # No walk is shorter than 1 move: the same walk stops at its first look
+        delta, ant, budget = self.walk(1)
+
+        self.assertIsNone(delta)
+        self.assertEqual(ant.steps, CHECK_EVERY)
+        self.assertEqual(budget.cancelled, 1)
+        self.assertEqual(budget.abandoned, 0)
+
+
+@needs_databases
+class ColonyPoolTest(unittest.TestCase):
+
+    def test_growing_table_keeps_seeded_runs(self):
+
+        instance = scramble(14, 3)
+        solution, pool = run_pool(instance)
+        grown_solution, grown_pool = run_pool(instance, capacity=16)
+
+        self.assertEqual(grown_solution, solution)
+        self.assertGreater(grown_pool.shared.capacity, 16)
+        self.assertEqual(len(grown_pool.shared), len(pool.shared))
+
+    def test_keeps_the_solution_when_the_bound_stops_every_walk(self):
+
+        # test.py's instance: rounds where the bound stopped every walk used to end the run with False
+        problem = puzzle(([2, 1, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 15, 14, 0], 15), number_of_ants=20, seed=3, processes=2)
+        problem.verbose = False
+
+        try:
+            solution = problem.run(5)
+        finally:
+            problem.colony_engine.close()
+
+        self.assertTrue(solution)
+        self.assertEqual(solution[-1], problem.generate_node_hash(problem.solution_states[0]))
+
+    def test_gives_up_when_nothing_gets_there(self):
+
+        # Walks of up to max_nodes steps can not get that far: it used to try forever
+        solution, pool = run_pool(scramble(40, 3), walk_limit=4, max_nodes=64)
+
+        self.assertFalse(solution)
+        self.assertEqual(len(pool.shared), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
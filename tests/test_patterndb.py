@@ -0,0 +1,63 @@
+# coding=utf-8
+import itertools
+import shutil
+import tempfile
+import unittest
+from patterndb import CompactPatternDatabase, SparsePatternDatabase
+from pdb_generator import generate
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+'''
+test_patterndb.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+'''
+
+
+class CompactDatabaseTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+
+        # The 3 tile table is generated in a moment, in both formats
+        cls.directory = tempfile.mkdtemp()
+        sparse_path, = generate(cls.directory, (0,), 1, 'sparse')
+        compact_path, = generate(cls.directory, (0,), 1, 'compact')
+
+        cls.sparse = SparsePatternDatabase(sparse_path)
+        cls.compact = CompactPatternDatabase(compact_path)
+
+        # Every placement of the 3 tiles in different cells
+        cls.indexes = [a | (b << 4) | (c << 8) for a, b, c in itertools.permutations(range(16), 3)]
+
+    @classmethod
+    def tearDownClass(cls):
+
+        shutil.rmtree(cls.directory)
+
+    def test_entries_are_packed(self):
+
+        self.assertEqual(self.compact.bits, 4)
+
+    def test_lookup_agrees(self):
+
+        for index in self.indexes:
+            self.assertEqual(self.compact.lookup(index), self.sparse.lookup(index))
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_lookup_many_agrees(self):
+
+        indexes = numpy.array(self.indexes, dtype=numpy.int64)
+        expected = [self.sparse.lookup(index) for index in self.indexes]
+
+        self.assertEqual(list(self.compact.lookup_many(indexes)), expected)
+        self.assertEqual(list(self.sparse.lookup_many(indexes)), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
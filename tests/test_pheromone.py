@@ -0,0 +1,138 @@
+# coding=utf-8
+import random
+import unittest
+from pheromone import PheromoneStore
+
+'''
+test_pheromone.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+'''
+
+RATE = 0.1
+
+
+class PheromoneStoreTest(unittest.TestCase):
+
+    def random_store(self, rng, iterations=300):
+
+        ''' A store after random operations, and the pheromone every edge
+            should have (evaporated eagerly)
+        '''
+
+        store = PheromoneStore()
+        eager = dict() # Edge id: pheromone
+
+        for _ in range(iterations):
+
+            for _ in range(20):
+
+                node_index = rng.randrange(1, 200)
+                successor = rng.randrange(1, 200)
+
+                if node_index == successor or (node_index in store and len(store.neighbours_of(node_index)) == 4) or \
+                   (successor in store and len(store.neighbours_of(successor)) == 4):
+                    continue
+
+                edge_id = store.add_edge(node_index, successor, 0.1)
+                eager.setdefault(edge_id, 0.1)
+
+                # Local update
+                store.set_weight(edge_id, store.weight(edge_id) * (1 - RATE) + RATE * 0.1)
+                eager[edge_id] = eager[edge_id] * (1 - RATE) + RATE * 0.1
+
+            path = [node for node, _, _ in list(store.edges())[:1]]
+
+            if path:
+                path.append(store.neighbours_of(path[0])[0][0])
+                store.deposit(path, 1.0)
+                eager[store.edge_id(path[0], path[1])] += 1.0
+
+            store.evaporate(RATE)
+
+            for edge_id in eager:
+                eager[edge_id] *= 1 - RATE
+
+        return store, eager
+
+    def test_lazy_evaporation_matches_eager(self):
+
+        store, eager = self.random_store(random.Random(1))
+
+        for edge_id, pheromone in eager.items():
+            self.assertAlmostEqual(store.weight(edge_id), pheromone, delta=1e-12 * max(1.0, pheromone))
+
+    def test_deposit_stays_within_bounds(self):
+
+        store = PheromoneStore()
+        store.add_edge(1, 2, 0.1)
+        store.bounds = (0.05, 1.0)
+
+        store.deposit([1, 2], 5.0)
+        self.assertEqual(store.weight(store.edge_id(1, 2)), 1.0)
+
+        # It evaporates from tau_max, not from what was deposited
+        store.evaporate(RATE)
+        self.assertAlmostEqual(store.weight(store.edge_id(1, 2)), 1.0 - RATE)
+
+    def test_prune_keeps_the_strongest_nodes_up_to_the_limit(self):
+
+        def chain():
+
+            # Node k has its strongest edge to k + 1: k / 100 over initial tau (node 100 the same as 99)
+            store = PheromoneStore()
+            for k in range(1, 100):
+                store.add_edge(k, k + 1, 0.1)
+            for k in range(1, 100):
+                store.deposit([k, k + 1], k / 100.0)
+            return store
+
+        store = chain()
+        self.assertEqual(store.prune(0.1, protected=(1, 2, 3), limit=10), 90)
+        self.assertEqual(sorted(store.node_indexes), [1, 2, 3, 94, 95, 96, 97, 98, 99, 100])
+        self.assertAlmostEqual(store.weight(store.edge_id(99, 100)), 1.09)
+
+        # The protected nodes stay, even over the limit
+        store = chain()
+        store.prune(0.1, protected=(1, 2, 3), limit=2)
+        self.assertEqual(sorted(store.node_indexes), [1, 2, 3])
+
+        # With no limit, every node over the threshold
+        store = chain()
+        store.prune(0.1 + 0.495, protected=(1,))
+        self.assertEqual(sorted(store.node_indexes), [1] + list(range(50, 101)))
+
+    def test_shortest_path_matches_breadth_first_search(self):
+
+        rng = random.Random(2)
+        store, _ = self.random_store(rng, iterations=30)
+
+        for _ in range(50):
+
+            source, target = rng.sample(list(store.node_indexes), 2)
+            path = store.shortest_path([source], [target])
+
+            distances = {source: 0}
+            level = [source]
+
+            while level:
+                next_level = list()
+                for node_index in level:
+                    for neighbour, _ in store.neighbours_of(node_index):
+                        if neighbour not in distances:
+                            distances[neighbour] = distances[node_index] + 1
+                            next_level.append(neighbour)
+                level = next_level
+
+            if target not in distances:
+                self.assertIsNone(path)
+                continue
+
+            self.assertEqual((path[0], path[-1]), (source, target))
+            self.assertEqual(len(path) - 1, distances[target])
+            self.assertTrue(all(store.has_edge(path[i], path[i + 1]) for i in range(len(path) - 1)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+# coding=utf-8
+import random
+import unittest
+from tests.helpers import needs_databases, puzzle
+
+'''
+test_puzzle.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+'''
+
+
+@needs_databases
+class SuccessorsWithCostTest(unittest.TestCase):
+
+    def check_walk(self, problem, steps=2000):
+
+        ''' Random walk checking every successor's incremental cost against calculate_cost '''
+
+        rng = random.Random(1)
+        state = problem.initial_states[0]
+        info = problem.heuristic_info(state)
+
+        for _ in range(steps):
+
+            successors = problem.successors_with_cost(state, info)
+
+            self.assertEqual(sorted(s for s, _, _ in successors), sorted(problem.successors(state)))
+
+            for successor, successor_info, cost in successors:
+                self.assertEqual(cost, problem.calculate_cost(successor))
+                indexes, values = problem.heuristic_info(successor)
+                self.assertEqual((tuple(successor_info[0]), tuple(successor_info[1])), (tuple(indexes), tuple(values)))
+
+            state, info, _ = rng.choice(successors)
+
+    def test_incremental_cost(self):
+
+        self.check_walk(puzzle())
+
+    def test_incremental_cost_with_cache(self):
+
+        self.check_walk(puzzle(cache_size=64))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+# coding=utf-8
+import random
+import unittest
+from idastar import ida_star
+from reoptimize import shorten
+from tests.helpers import needs_databases, puzzle, SOLUTION
+
+'''
+test_reoptimize.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+'''
+
+
+@needs_databases
+class ShortenTest(unittest.TestCase):
+
+    def setUp(self):
+
+        # A long way round to the solution: 40 moves, never straight back
+        self.puzzle = puzzle()
+        rng = random.Random(1)
+        walk = [self.puzzle.pack_state(SOLUTION)]
+
+        for _ in range(40):
+            walk.append(rng.choice([s for s in self.puzzle.successors(walk[-1]) if len(walk) < 2 or s != walk[-2]]))
+
+        self.solution = [self.puzzle.generate_node_hash(s) for s in reversed(walk)]
+        self.optimal, _ = ida_star(self.puzzle, walk[-1])
+
+    def check(self, shorter):
+
+        problem = self.puzzle
+
+        self.assertEqual((shorter[0], shorter[-1]), (self.solution[0], self.solution[-1]))
+        self.assertEqual(len(shorter), len(self.optimal))
+
+        for a, b in zip(shorter, shorter[1:]):
+            self.assertIn(b, [problem.generate_node_hash(s) for s in problem.successors(problem.node_state(a))])
+
+    def test_shorten(self):
+
+        self.check(shorten(self.puzzle, self.solution, window=12))
+
+    def test_shorten_in_processes(self):
+
+        self.check(shorten(self.puzzle, self.solution, window=12, processes=2))
+
+    def test_window_too_short(self):
+
+        # Used to loop forever
+        for window in (-2, 0, 1):
+            self.assertRaises(ValueError, shorten, self.puzzle, self.solution, window)
+
+
+if __name__ == '__main__':
+    unittest.main()
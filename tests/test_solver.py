@@ -0,0 +1,117 @@
+# coding=utf-8
+import unittest
+from solver import DEFAULT_PARAMETERS, SOLUTION, parse_instance, puzzle_parameters, solvable
+from strategies import BestAnt
+from tests.helpers import PDB_DIRECTORY, needs_databases, scramble
+
+'''
+test_solver.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+'''
+
+
+class ParseInstanceTest(unittest.TestCase):
+
+    def test_solvable_instances(self):
+
+        self.assertEqual(parse_instance('2 1 3 4 5 6 7 8 9 10 11 12 13 15 14 0'),
+                         ([2, 1, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 15, 14, 0], 15))
+
+        for seed in range(20):
+            self.assertTrue(solvable(scramble(30 + seed, seed)[0]))
+
+    def test_unsolvable_instances(self):
+
+        # Two tiles swapped: Loyd's 14-15 puzzle
+        swapped = list(SOLUTION[0])
+        swapped[13], swapped[14] = swapped[14], swapped[13]
+
+        self.assertFalse(solvable(swapped))
+        self.assertRaises(ValueError, parse_instance, ' '.join(str(t) for t in swapped))
+
+        for seed in range(20):
+            tiles = scramble(30 + seed, seed)[0]
+            i, j = [k for k in range(16) if tiles[k] != 0][:2]
+            tiles[i], tiles[j] = tiles[j], tiles[i]
+            self.assertFalse(solvable(tiles))
+
+    def test_not_tiles(self):
+
+        self.assertRaises(ValueError, parse_instance, '1 2 3')
+        self.assertIsNone(parse_instance('# nothing'))
+
+
+class PuzzleParametersTest(unittest.TestCase):
+
+    def test_defaults(self):
+
+        parameters, same_results_condition, mode, window = puzzle_parameters(dict())
+
+        self.assertEqual(same_results_condition, DEFAULT_PARAMETERS['same_results_condition'])
+        self.assertEqual(mode, 'aco')
+        self.assertEqual(window, 0)
+        self.assertIsNone(parameters['prune_nodes'])
+        self.assertIsInstance(parameters['strategy'], BestAnt)
+
+        for name in ('same_results_condition', 'mode', 'window'):
+            self.assertNotIn(name, parameters)
+
+    def test_overrides(self):
+
+        parameters, _, mode, window = puzzle_parameters({'mode': 'hybrid', 'window': 8, 'prune_nodes': 1000})
+
+        self.assertEqual((mode, window), ('hybrid', 8))
+        self.assertEqual(parameters['prune_nodes'], 1000)
+
+
+@needs_databases
+class StartupTest(unittest.TestCase):
+
+    def test_first_iteration(self):
+
+        from startup import first_iteration
+
+        timings = first_iteration(PDB_DIRECTORY)
+
+        self.assertEqual(timings['heavy_modules'], [])
+        self.assertGreaterEqual(timings['first_iteration'], 0)
+
+
+@needs_databases
+class ServiceTest(unittest.TestCase):
+
+    def test_window_too_short(self):
+
+        from service import Service
+
+        service = Service(PDB_DIRECTORY)
+        result = service.handle('{"id": 1, "tiles": [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 0, 15], "window": -2}')
+
+        self.assertEqual(result['id'], 1)
+        self.assertIn('window', result['error'])
+
+    def test_unsolvable(self):
+
+        from service import Service
+
+        service = Service(PDB_DIRECTORY)
+        result = service.handle('{"id": 2, "tiles": [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 15, 14, 0], "mode": "exact"}')
+
+        self.assertEqual(result['id'], 2)
+        self.assertIn('can not be solved', result['error'])
+
+    def test_window(self):
+
+        from service import Service
+
+        service = Service(PDB_DIRECTORY)
+        result = service.handle('{"tiles": [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 0, 15], "window": 2}')
+
+        self.assertTrue(result['solved'])
+        self.assertEqual(result['length'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+# coding=utf-8
+import unittest
+from pheromone import PheromoneStore
+from strategies import ColonySystem, MaxMinAntSystem, RankBasedAntSystem
+
+'''
+test_strategies.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+'''
+
+SHORT = [1, 2, 3, 4]
+LONG = [1, 5, 6, 7, 4]
+LONGER = [1, 5, 6, 8, 9, 4]
+
+
+class Problem(object):
+
+    ''' What the strategies use of an ACOProblem '''
+
+    p = 0.1
+    initial_tau = 0.1
+
+    def pheromone_update_criteria(self, solution):
+
+        return 1.0 / len(solution)
+
+
+class RecordingStore(PheromoneStore):
+
+    ''' PheromoneStore that keeps every deposit '''
+
+    def __init__(self):
+
+        PheromoneStore.__init__(self)
+        self.deposits = list()
+
+    def deposit(self, path, amount):
+
+        self.deposits.append((path, amount))
+        PheromoneStore.deposit(self, path, amount)
+
+
+def graph(store=None):
+
+    store = store if store is not None else PheromoneStore()
+
+    for path in (SHORT, LONG, LONGER):
+        for a, b in zip(path, path[1:]):
+            store.add_edge(a, b, 0.1)
+
+    return store
+
+
+def weights(store):
+
+    return dict(((a, b), store.weight(store.edge_id(a, b))) for a, b, _ in store.edges())
+
+
+class StrategiesTest(unittest.TestCase):
+
+    def test_colony_system_only_touches_the_best_path(self):
+
+        problem = Problem()
+        store = graph()
+        before = weights(store)
+
+        ColonySystem().global_update(problem, store, [LONG, SHORT])
+
+        best_edges = set(zip(SHORT, SHORT[1:]))
+        amount = problem.pheromone_update_criteria(SHORT)
+
+        for edge, weight in weights(store).items():
+            if edge in best_edges or edge[::-1] in best_edges:
+                self.assertAlmostEqual(weight, before[edge] * (1 - problem.p) + problem.p * amount)
+            else:
+                self.assertEqual(weight, before[edge])
+
+    def test_rank_weights(self):
+
+        problem = Problem()
+        store = graph(RecordingStore())
+        strategy = RankBasedAntSystem(ranks=3)
+
+        strategy.global_update(problem, store, [LONGER, SHORT, LONG])
+
+        # The r-th best ant of the iteration deposits (ranks - 1 - r) Q / length, the best so far ranks Q / length
+        self.assertEqual(store.deposits, [(SHORT, 2 * 1.0 / 4), (LONG, 1 * 1.0 / 5), (SHORT, 3 * 1.0 / 4)])
+
+        del store.deposits[:]
+        strategy.global_update(problem, store, [LONGER, LONG])
+
+        self.assertEqual(store.deposits, [(LONG, 2 * 1.0 / 5), (LONGER, 1 * 1.0 / 6), (SHORT, 3 * 1.0 / 4)])
+
+    def test_max_min_restarts_after_stagnation(self):
+
+        problem = Problem()
+        store = graph()
+        strategy = MaxMinAntSystem(restart_after=2)
+
+        strategy.global_update(problem, store, [SHORT])
+        tau_max = strategy.bounds(problem)[1]
+
+        strategy.global_update(problem, store, [LONG])
+        self.assertEqual(strategy.restarts, 0)
+        self.assertNotEqual(set(weights(store).values()), set([tau_max]))
+
+        strategy.global_update(problem, store, [LONGER])
+        self.assertEqual(strategy.restarts, 1)
+        self.assertEqual(strategy.stagnation, 0)
+        self.assertEqual(set(weights(store).values()), set([tau_max]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+# coding=utf-8
+import unittest
+from streams import random_stream
+from tests.helpers import needs_databases, puzzle, scramble
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+'''
+test_streams.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+'''
+
+
+class StreamsTest(unittest.TestCase):
+
+    def test_same_seed_and_stream_repeat(self):
+
+        a = [random_stream(7, 0).random() for _ in range(3)]
+        b = [random_stream(7, 0).random() for _ in range(3)]
+
+        self.assertEqual(a, b)
+
+    def test_streams_are_independent(self):
+
+        self.assertNotEqual(random_stream(7, 0).random(), random_stream(7, 1).random())
+        self.assertNotEqual(random_stream(7, 0).random(), random_stream(8, 0).random())
+
+
+
+def seeded_run(**engine):
+
+    ''' Best solution and iterations of a seeded run '''
+
+    problem = puzzle(scramble(16, 3), number_of_ants=10, seed=42, **engine)
+    problem.verbose = False
+
+    try:
+        problem.run(3)
+    finally:
+        if hasattr(problem.colony_engine, 'close'):
+            problem.colony_engine.close()
+
+    return (problem.global_best_solution, problem.iterations)
+
+
+@needs_databases
+class SeededRunTest(unittest.TestCase):
+
+    def check_repeats(self, **engine):
+
+        first = seeded_run(**engine)
+
+        self.assertTrue(first[0])
+        self.assertEqual(seeded_run(**engine), first)
+
+    def test_mono_repeats(self):
+
+        self.check_repeats()
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_vectorized_repeats(self):
+
+        self.check_repeats(vectorized=True)
+
+    def test_pool_repeats(self):
+
+        self.check_repeats(processes=2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+# coding=utf-8
+import random
+import unittest
+from ant import erase_loops
+from tests.helpers import needs_databases, puzzle, scramble
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+'''
+test_vectorized.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+'''
+
+needs_numpy = unittest.skipIf(numpy is None, "numpy is not installed")
+
+
+@needs_numpy
+@needs_databases
+class VectorizedColonyTest(unittest.TestCase):
+
+    def colony(self, depth, **parameters):
+
+        from vectorized import VectorizedColony
+
+        problem = puzzle(scramble(depth, 3), number_of_ants=10, seed=42)
+
+        return (problem, VectorizedColony(problem, **parameters))
+
+    def test_loops_are_erased_as_it_walks(self):
+
+        problem, colony = self.colony(0)
+        colony.place_ants()
+
+        rng = random.Random(1)
+        walk = colony.path(0)
+
+        for _ in range(200):
+            node = rng.randint(1, 8)
+            walk.append(node)
+            colony.walk_to(0, node)
+
+        self.assertEqual(colony.path(0), erase_loops(walk))
+
+    def test_ants_over_the_limit_start_again(self):
+
+        problem, colony = self.colony(12, walk_limit=20)
+        problem.walk_budget = None
+
+        solutions = colony.generate_ant_solutions()
+
+        self.assertTrue(solutions)
+        self.assertTrue(all(colony.steps <= 20))
+
+        for solution in solutions:
+            self.assertEqual(solution[0], problem.generate_node_hash(problem.initial_states[0]))
+            self.assertEqual(solution[-1], problem.generate_node_hash(problem.solution_states[0]))
+            self.assertLessEqual(len(solution) - 1, 20)
+
+    def test_ants_that_can_not_beat_the_bound_start_again(self):
+
+        from idastar import ida_star
+
+        problem, colony = self.colony(12)
+        optimal, _ = ida_star(problem, problem.initial_states[0])
+        problem.walk_budget.update(len(optimal))
+
+        solutions = colony.generate_ant_solutions()
+
+        self.assertTrue(solutions)
+        self.assertTrue(all(len(solution) - 1 <= len(optimal) for solution in solutions))
+        self.assertGreater(problem.walk_budget.pruned, 0)
+
+    def test_keeps_the_best_solution_over_max_nodes(self):
+
+        problem, colony = self.colony(12)
+        problem.max_nodes = 0
+
+        self.assertFalse(colony.generate_ant_solutions())
+
+        problem.global_best_solution = [1, 2, 3]
+
+        self.assertEqual(colony.generate_ant_solutions(), [[1, 2, 3]])
+
+
+if __name__ == '__main__':
+    unittest.main()
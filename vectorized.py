@@ -0,0 +1,423 @@
+# coding=utf-8
+from __future__ import division
+import numpy
+
+import hashtable
+from patterndb import TILE_SUBSETS, TILE_POSITIONS
+from streams import stream_seed, VECTORIZED_STREAM
+
+'''
+vectorized.py
+
+@Author: Alfonso Perez-Embid (Twitter: @fonsurfing)
+
+A colony for the 15 puzzle that moves every ant at once with numpy, instead
+of calling Ant.__iteration__ once per ant. Positions, candidate moves,
+pheromones and heuristic values are arrays with one row per ant, so a step
+of the whole colony is a handful of array operations.
+
+It follows the same rules as Ant (proportional pseudo-random transition,
+no going straight back, loops erased as it walks, local update, positive
+feedback of the best ant) but keeps its pheromone in its own arrays:
+VectorizedPheromones. An ant that walks more than its limit (the walk
+budget's, see budget.py, or walk_limit before there is one) starts again,
+and so does one that can no longer beat the best solution so far.
+
+This is the only module that needs numpy.
+'''
+
+EMPTY = numpy.uint64(hashtable.EMPTY)
+HASH_MULTIPLIER = numpy.uint64(hashtable.HASH_MULTIPLIER)
+
+# Directions of the hole: down, left, up, right (the order of Puzzle.successors)
+# MOVES[hole, direction] is the cell the hole moves to, -1 if it can't
+MOVES = numpy.full((16, 4), -1, dtype=numpy.int64)
+
+for _hole in range(16):
+    if _hole <= 11:
+        MOVES[_hole, 0] = _hole + 4
+    if _hole % 4 != 0:
+        MOVES[_hole, 1] = _hole - 1
+    if _hole >= 4:
+        MOVES[_hole, 2] = _hole - 4
+    if _hole % 4 != 3:
+        MOVES[_hole, 3] = _hole + 1
+
+# Moving back undoes the move in the opposite direction
+OPPOSITE = numpy.array([2, 3, 0, 1], dtype=numpy.int64)
+
+SUBSET_OF_TILE = numpy.array([max(s, 0) for s in TILE_SUBSETS], dtype=numpy.int64)
+NIBBLE_OF_TILE = numpy.array([max(p, 0) for p in TILE_POSITIONS], dtype=numpy.int64)
+
+
+class VectorizedPheromones(object):
+
+    ''' Open addressing hash table of nodes (packed states) with the pheromone
+        of their 4 edges, one per hole direction. The same hash and linear
+        probe as hashtable.probe, on every key at once (see _place).
+
+        An edge joins two nodes, so it is only kept in the row of the smaller
+        one (see edge_positions). Every edge starts with initial_tau.
+    '''
+
+    def __init__(self, initial_tau, capacity=1 << 16):
+
+        self.initial_tau = initial_tau
+        self.keys = numpy.zeros(capacity, dtype=numpy.uint64)
+        self.weights = numpy.full((capacity, 4), initial_tau, dtype=numpy.float64)
+        self.number_of_nodes = 0
+
+    def __len__(self):
+
+        return self.number_of_nodes
+
+    def _home(self, keys, capacity):
+
+        bits = numpy.uint64(hashtable.home_shift(capacity))
+
+        return ((keys * HASH_MULTIPLIER) >> bits).astype(numpy.int64)
+
+    def _place(self, table, keys):
+
+        ''' Finds (or claims) the row of every key, all different and not EMPTY.
+            Returns the rows and how many keys were not in the table
+        '''
+
+        mask = len(table) - 1
+        rows = self._home(keys, len(table))
+        pending = numpy.arange(len(keys))
+        claimed = 0
+
+        while len(pending) > 0:
+
+            empty = table[rows[pending]] == EMPTY
+
+            # Several keys may claim the same empty row: one of them wins
+            table[rows[pending[empty]]] = keys[pending[empty]]
+
+            settled = table[rows[pending]] == keys[pending]
+            claimed += numpy.count_nonzero(settled & empty)
+            pending = pending[~settled]
+            rows[pending] = (rows[pending] + 1) & mask
+
+        return rows, claimed
+
+    def rows(self, keys):
+
+        ''' rows
+            Parameters:
+            keys: numpy uint64 array of node indexes
+
+            Returns the row of each key, adding the new ones
+        '''
+
+        unique, inverse = numpy.unique(keys, return_inverse=True)
+
+        # We keep the table at most half full
+        if 2 * (self.number_of_nodes + len(unique)) > len(self.keys):
+            self._grow(self.number_of_nodes + len(unique))
+
+        unique_rows, claimed = self._place(self.keys, unique)
+        self.number_of_nodes += claimed
+
+        return unique_rows[inverse]
+
+    def _grow(self, minimum):
+
+        capacity = len(self.keys)
+
+        while capacity < 4 * minimum:
+            capacity <<= 1
+
+        used = numpy.nonzero(self.keys != EMPTY)[0]
+
+        keys = numpy.zeros(capacity, dtype=numpy.uint64)
+        weights = numpy.full((capacity, 4), self.initial_tau, dtype=numpy.float64)
+
+        new_rows, _ = self._place(keys, self.keys[used])
+        weights[new_rows] = self.weights[used]
+
+        self.keys = keys
+        self.weights = weights
+
+    def evaporate(self, rate):
+
+        ''' Every edge loses rate of its pheromone. Free rows keep initial_tau for the nodes to come '''
+
+        self.weights[self.keys != EMPTY] *= 1 - rate
+
+    def edge_positions(self, node_keys, node_rows, direction, other_keys, other_rows):
+
+        ''' Flat positions in weights of the edges between both nodes, where
+            direction is the move that takes node to other
+        '''
+
+        smaller = node_keys < other_keys
+        rows = numpy.where(smaller, node_rows, other_rows)
+        directions = numpy.where(smaller, direction, OPPOSITE[direction])
+
+        return rows * 4 + directions
+
+    def path_positions(self, path):
+
+        ''' Flat positions in weights of the edges of a path (list of node indexes) '''
+
+        keys = numpy.array(path, dtype=numpy.uint64)
+        rows = self.rows(keys)
+        holes = _holes(keys)
+        deltas = holes[1:] - holes[:-1]
+        directions = numpy.select([deltas == 4, deltas == -1, deltas == -4], [0, 1, 2], 3)
+
+        return self.edge_positions(keys[:-1], rows[:-1], directions, keys[1:], rows[1:])
+
+
+def _holes(keys):
+
+    ''' Cell of the hole of each packed state, see Puzzle.node_state '''
+
+    zeros = ~keys
+    zeros &= zeros >> numpy.uint64(1)
+    zeros &= zeros >> numpy.uint64(2)
+    zeros &= numpy.uint64(0x1111111111111111)
+
+    # Only one nibble is left with a bit, find which
+    holes = numpy.zeros(keys.shape, dtype=numpy.int64)
+
+    for cell in range(16):
+        holes[(zeros >> numpy.uint64(cell << 2)) & numpy.uint64(1) == 1] = cell
+
+    return holes
+
+
+class VectorizedColony(object):
+
+    ''' vectorized colony
+        Parameters:
+        problem: the Puzzle (parameters, pattern databases, start and solution)
+        number_of_ants: defaults to problem.number_of_ants
+        seed: seed of the numpy random generator, defaults to a stream of
+        the problem's seed (see streams.py)
+        walk_limit: steps after which an ant starts again, until the problem's
+        walk_budget has a limit of its own
+    '''
+
+    def __init__(self, problem, number_of_ants=None, seed=None, walk_limit=10000):
+
+        self.problem = problem
+        self.number_of_ants = number_of_ants or problem.number_of_ants
+        self.walk_limit = walk_limit
+        if seed is None and problem.seed is not None:
+            # numpy wants 32 bits
+            seed = stream_seed(problem.seed, VECTORIZED_STREAM) >> 32
+
+        self.random = numpy.random.RandomState(seed)
+        self.pheromones = VectorizedPheromones(problem.initial_tau)
+        self.databases = (problem.pdb0, problem.pdb1, problem.pdb2)
+
+        self.solution = numpy.uint64(problem.generate_node_hash(problem.solution_states[0]))
+
+    def place_ants(self):
+
+        ''' Every ant back to a start node (the first initial state) '''
+
+        n = self.number_of_ants
+
+        self.tiles = numpy.zeros(n, dtype=numpy.uint64)
+        self.holes = numpy.zeros(n, dtype=numpy.int64)
+        self.indexes = numpy.zeros((n, len(self.databases)), dtype=numpy.int64)
+        self.values = numpy.zeros((n, len(self.databases)), dtype=numpy.int64)
+        self.last = numpy.zeros(n, dtype=numpy.uint64)
+        self.steps = numpy.zeros(n, dtype=numpy.int64)
+        self.paths = [None] * n
+        self.visited = [None] * n
+
+        self.restart(numpy.arange(n))
+
+    def restart(self, ants):
+
+        ''' The ants (array of ant numbers) back to the start node, with a new path '''
+
+        start = self.problem.initial_states[0]
+        indexes, values = self.problem.heuristic_info(start)
+
+        self.tiles[ants] = start[0]
+        self.holes[ants] = start[1]
+        self.indexes[ants] = indexes
+        self.values[ants] = values
+        self.last[ants] = 0
+        self.steps[ants] = 0
+        self.finished = self.tiles == self.solution
+
+        for ant in ants:
+            self.paths[ant] = [int(start[0])]
+            self.visited[ant] = {int(start[0]): 0} # Node index: its position in the path
+
+    def walk_to(self, ant, node):
+
+        ''' Adds node to the path of the ant, erasing the loop if it was already there (as Ant.move_ant) '''
+
+        path = self.paths[ant]
+        visited = self.visited[ant]
+        position = visited.get(node)
+
+        if position is None:
+            visited[node] = len(path)
+            path.append(node)
+        else:
+            for erased in path[position + 1:]:
+                del visited[erased]
+            del path[position + 1:]
+
+    def limit(self):
+
+        ''' Steps an ant may walk: the walk budget's limit if it has one (see budget.py), walk_limit otherwise '''
+
+        budget = self.problem.walk_budget
+
+        return budget.limit if budget is not None and budget.limit is not None else self.walk_limit
+
+    def step(self):
+
+        ''' Moves every ant that has not found the solution yet one node '''
+
+        problem = self.problem
+        ants = numpy.nonzero(~self.finished)[0]
+        tiles = self.tiles[ants]
+        holes = self.holes[ants]
+
+        # Candidate moves (ants x 4 directions)
+        new_holes = MOVES[holes]
+        valid = new_holes >= 0
+        safe_holes = numpy.where(valid, new_holes, holes[:, None])
+
+        shift = (safe_holes << 2).astype(numpy.uint64)
+        hole_shift = (holes << 2).astype(numpy.uint64)[:, None]
+        moved = (tiles[:, None] >> shift) & numpy.uint64(0xF)
+        candidates = tiles[:, None] ^ (moved << shift) ^ (moved << hole_shift)
+
+        # No going straight back
+        valid &= candidates != self.last[ants][:, None]
+
+        # Heuristic: only the moved tile's subset index changes
+        moved = moved.astype(numpy.int64)
+        subsets = SUBSET_OF_TILE[moved]
+        rows = numpy.arange(len(ants))[:, None]
+        changed = self.indexes[ants][rows, subsets] ^ ((holes[:, None] ^ safe_holes) << (NIBBLE_OF_TILE[moved] << 2))
+
+        new_values = numpy.zeros(changed.shape, dtype=numpy.int64)
+        for subset, database in enumerate(self.databases):
+            in_subset = subsets == subset
+            new_values[in_subset] = database.lookup_many(changed[in_subset])
+
+        costs = self.values[ants].sum(axis=1)[:, None] - self.values[ants][rows, subsets] + new_values
+
+        # Pheromone of the candidate edges
+        node_rows = self.pheromones.rows(tiles)
+        candidate_rows = self.pheromones.rows(candidates.ravel()).reshape(candidates.shape)
+        directions = numpy.tile(numpy.arange(4), (len(ants), 1))
+        positions = self.pheromones.edge_positions(tiles[:, None], node_rows[:, None], directions, candidates, candidate_rows)
+        tau = self.pheromones.weights.ravel()[positions]
+
+        with numpy.errstate(divide='ignore'):
+            eta = numpy.where(costs > 0, 1.0 / numpy.maximum(costs, 1), float(2 ** 62))
+
+        attractiveness = numpy.where(valid, numpy.power(tau, problem.alpha) * numpy.power(eta, problem.beta), 0.0)
+
+        # Proportional pseudo-random rule, for every ant at once
+        exploit = self.random.random_sample(len(ants)) <= problem.q0
+        best = attractiveness.argmax(axis=1)
+        cumulative = attractiveness.cumsum(axis=1)
+        draw = self.random.random_sample(len(ants)) * cumulative[:, -1]
+        roulette = numpy.minimum((cumulative <= draw[:, None]).sum(axis=1), 3)
+        choice = numpy.where(exploit, best, roulette)
+
+        # If the solution is next, just go to it
+        at_solution = valid & (candidates == self.solution)
+        choice = numpy.where(at_solution.any(axis=1), at_solution.argmax(axis=1), choice)
+
+        chosen = numpy.arange(len(ants))
+
+        # Local update
+        traversed = positions[chosen, choice]
+        weights = self.pheromones.weights.ravel()
+        weights[traversed] = weights[traversed] * (1 - problem.p) + problem.p * problem.initial_tau
+
+        self.last[ants] = tiles
+        self.tiles[ants] = candidates[chosen, choice]
+        self.holes[ants] = safe_holes[chosen, choice]
+        chosen_subsets = subsets[chosen, choice]
+        self.indexes[ants, chosen_subsets] = changed[chosen, choice]
+        self.values[ants, chosen_subsets] = new_values[chosen, choice]
+        self.finished[ants] = self.tiles[ants] == self.solution
+        self.steps[ants] += 1
+
+        for ant, node in zip(ants.tolist(), self.tiles[ants].tolist()):
+            self.walk_to(ant, node)
+
+    def path(self, ant):
+
+        ''' Node indexes visited by an ant, in order, without loops (as Ant's paths) '''
+
+        return list(self.paths[ant])
+
+    def generate_ant_solutions(self):
+
+        ''' generate_ant_solutions
+            Parameters:
+            none
+
+            Return:
+            A list of solutions (paths), like ACOProblem.generate_ant_solutions_mono.
+            When the pheromone table grows over problem.max_nodes, the best
+            solution so far as the only one, or False if there is none
+        '''
+
+        problem = self.problem
+        budget = problem.walk_budget
+        bound = budget.bound if budget is not None else None
+        limit = self.limit()
+        restarted = 0
+        pruned = 0
+
+        self.place_ants()
+
+        while not self.finished.any():
+
+            if len(self.pheromones) > problem.max_nodes:
+                return [list(problem.global_best_solution)] if problem.global_best_solution else False
+
+            self.step()
+
+            # Ants over the limit start again
+            over = numpy.nonzero((self.steps > limit) & ~self.finished)[0]
+
+            if len(over) > 0:
+                self.restart(over)
+                restarted += len(over)
+
+            # And so do the ones that can not beat the best solution: their path plus
+            # the heuristic of where they are (which never overestimates) is longer
+            if bound is not None:
+                moves = numpy.array([len(path) - 1 for path in self.paths], dtype=numpy.int64)
+                beaten = numpy.nonzero((moves + self.values.sum(axis=1) > bound) & ~self.finished)[0]
+
+                if len(beaten) > 0:
+                    self.restart(beaten)
+                    pruned += len(beaten)
+
+        # The rate is the one of the ants that got there against the ones the limit stopped (see budget.py)
+        if budget is not None:
+            finished = numpy.count_nonzero(self.finished)
+            budget.abandoned += restarted
+            budget.pruned += pruned
+            budget.record(finished, finished + restarted)
+
+        solutions = [self.path(ant) for ant in numpy.nonzero(self.finished)[0]]
+
+        # Global update: evaporation of every edge, then the best ant's feedback
+        best = min(solutions, key=len)
+        positions = self.pheromones.path_positions(best)
+        self.pheromones.evaporate(self.problem.p)
+        numpy.add.at(self.pheromones.weights.ravel(), positions, self.problem.pheromone_update_criteria(best))
+
+        return solutions